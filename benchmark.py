@@ -0,0 +1,202 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from loader import MONEY_COLUMNS
+from parallel import compute_rfm_parallel
+from migration import monthly_reference_dates, segment_snapshots
+from rfm import REFERENCE_DATE, SEGMENTS, add_order_metrics, compute_rfm, customer_segments, downcast_money
+from sketch import compute_rfm_approx
+
+# Benchmark sederhana untuk pipeline RFM, dijalankan dengan: python benchmark.py rfm --sizes 10000 1000000 10000000
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+
+
+def synthetic_raw_orders(n, customers=None, seed=0, compact=True):
+    # Data order sintetis dengan skema yang sama seperti loader.read_sales(); compact=False memakai int64/float64
+    rng = np.random.default_rng(seed)
+    customers = customers or max(50, n // 20)
+    start = np.datetime64('2018-05-31')
+    id_dtype = np.int32 if compact else np.int64
+    df = pd.DataFrame({
+        'OrderNumber': np.arange(n, dtype=np.int64),
+        'Sales Channel': pd.Categorical.from_codes(rng.integers(0, 4, n), ['In-Store', 'Online', 'Distributor', 'Wholesale']),
+        'OrderDate': start + rng.integers(0, 945, n).astype('timedelta64[D]'),
+        '_CustomerID': rng.integers(1, customers + 1, n).astype(id_dtype),
+        '_ProductID': rng.integers(1, 48, n).astype(id_dtype),
+        'Order Quantity': rng.integers(1, 9, n).astype(id_dtype),
+        'Discount Applied': rng.choice([0.05, 0.075, 0.1, 0.15, 0.3, 0.4], n),
+        'Unit Cost': np.round(rng.uniform(70, 5500, n), 2),
+    })
+    df['Unit Price'] = np.round(df['Unit Cost'] * rng.uniform(1.05, 2.5, n), 2)
+    return downcast_money(df, MONEY_COLUMNS) if compact else df
+
+
+def synthetic_orders(n, customers=None, seed=0):
+    return add_order_metrics(synthetic_raw_orders(n, customers, seed))
+
+
+def timed(fn, *args, repeat=3, **kwargs):
+    # Waktu terbaik dari beberapa percobaan, dalam detik
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_rfm(sizes, repeat):
+    for n in sizes:
+        df = synthetic_orders(n)
+        seconds = timed(compute_rfm, df, REFERENCE_DATE, repeat=repeat)
+        print(f"compute_rfm  rows={n:>12,}  {seconds * 1000:10.1f} ms  {n / seconds:14,.0f} rows/s")
+
+
+def bench_parallel(sizes, repeat, workers=(1, 2, 4, 8)):
+    # Speedup hanya bermakna bila jumlah worker <= jumlah CPU yang tersedia
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"compute_rfm_parallel  {cpus} CPU available")
+    for n in sizes:
+        df = synthetic_orders(n)
+        baseline = None
+        for w in workers:
+            seconds = timed(compute_rfm_parallel, df, REFERENCE_DATE, workers=w, repeat=repeat)
+            baseline = baseline or seconds
+            print(f"compute_rfm_parallel  rows={n:>12,}  workers={w}  {seconds * 1000:10.1f} ms  speedup {baseline / seconds:5.2f}x")
+
+
+def bench_sketch(sizes, repeat, accuracies=(0.05, 0.01, 0.001), workers=4):
+    # Di jalur parallel, sketch per shard dibangun di worker dan di-merge; yang dibandingkan adalah waktu total
+    # terhadap persentil exact di proses induk
+    for n in sizes:
+        df = synthetic_orders(n)
+        exact = timed(compute_rfm, df, REFERENCE_DATE, repeat=repeat)
+        parallel_exact = timed(compute_rfm_parallel, df, REFERENCE_DATE, workers=workers, repeat=repeat)
+        print(f"compute_rfm           rows={n:>12,}  exact         {exact * 1000:10.1f} ms")
+        print(f"compute_rfm_parallel  rows={n:>12,}  exact         {parallel_exact * 1000:10.1f} ms  workers={workers}")
+        for accuracy in accuracies:
+            seconds = timed(compute_rfm_approx, df, REFERENCE_DATE, relative_accuracy=accuracy, compare=False, repeat=repeat)
+            parallel_seconds = timed(compute_rfm_parallel, df, REFERENCE_DATE, workers=workers, relative_accuracy=accuracy, repeat=repeat)
+            rfm_table, changed = compute_rfm_approx(df, REFERENCE_DATE, relative_accuracy=accuracy)
+            print(f"compute_rfm_approx    rows={n:>12,}  error={accuracy:<6}  {seconds * 1000:10.1f} ms  "
+                  f"changed {changed:,}/{len(rfm_table):,} customers")
+            print(f"compute_rfm_parallel  rows={n:>12,}  error={accuracy:<6}  {parallel_seconds * 1000:10.1f} ms  workers={workers}")
+
+
+def _snapshots_by_groupby(df, reference_dates):
+    # Jalur naif: filter dan groupby penuh untuk setiap tanggal referensi
+    return [compute_rfm(df[df['OrderDate'] < date], date) for date in reference_dates]
+
+
+def bench_migration(sizes, repeat):
+    for n in sizes:
+        df = synthetic_orders(n)
+        dates = monthly_reference_dates(df)
+        single = timed(compute_rfm, df, REFERENCE_DATE, repeat=repeat)
+        snapshots = timed(segment_snapshots, df, dates, repeat=repeat)
+        naive = timed(_snapshots_by_groupby, df, dates, repeat=1)
+        print(f"migration  rows={n:>12,}  1 snapshot {single * 1000:10.1f} ms  {len(dates)} snapshots: "
+              f"single pass {snapshots * 1000:10.1f} ms  groupby per date {naive * 1000:10.1f} ms")
+
+
+def _legacy_segment_frame(df, rfm_table, selected):
+    # Jalur lama: kolom float64 baru, merge seluruh frame order untuk label segmen (string), lalu isin
+    df['Sales per Order'] = round(df['Order Quantity'] * df['Unit Price'] * (1 - df['Discount Applied']), 2)
+    df['Profit per Order'] = round(df['Sales per Order'] - (df['Order Quantity'] * df['Unit Cost']), 2)
+    segments = rfm_table[['_CustomerID', 'Customer Segment']].astype({'Customer Segment': object})
+    df = df.merge(segments, on='_CustomerID', how='left')
+    return df[df['Customer Segment'].isin(selected)]
+
+
+def _compact_segment_frame(df, rfm_table, selected):
+    # Jalur hemat memori: kolom turunan float32, segmen lewat lookup codes[customer_id], filter dengan boolean take
+    df = add_order_metrics(df)
+    segments = customer_segments(df['_CustomerID'], rfm_table)
+    selected_codes = [SEGMENTS.index(segment) for segment in selected]
+    return df[np.isin(segments.codes, selected_codes)]
+
+
+def _peak_memory(fn, *args):
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(sizes, repeat, selected=('Champions', 'Loyal')):
+    for n in sizes:
+        rfm_table = compute_rfm(synthetic_orders(n))
+        results = {}
+        for name, compact, fn in [('legacy', False, _legacy_segment_frame), ('compact', True, _compact_segment_frame)]:
+            df = synthetic_raw_orders(n, compact=compact)
+            frame_bytes = df.memory_usage(deep=True).sum()
+            peak, result = _peak_memory(fn, df, rfm_table, list(selected))
+            results[name] = peak
+            print(f"memory  rows={n:>12,}  {name:<8} raw frame {frame_bytes / 2**20:9.1f} MiB  "
+                  f"peak {peak / 2**20:9.1f} MiB  filtered rows {len(result):,}")
+            del df, result
+        print(f"memory  rows={n:>12,}  peak saving {1 - results['compact'] / results['legacy']:.0%}")
+
+
+PAGES = {'Home': None, 'Project': 'main', 'About Me': 'kontak'}
+
+STARTUP_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+{import_line}
+imported = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file('home.py', default_timeout=600)
+app.run()
+if {page!r} != 'Home':
+    app.sidebar.radio[0].set_value({page!r})
+    app.run()
+painted = time.perf_counter()
+print(imported - start, painted - imported)
+'''
+
+
+def bench_startup(sizes, repeat):
+    # Setiap pengukuran dijalankan di proses Python baru: waktu import modul halaman (cold start)
+    # dan waktu sampai halaman selesai dirender pertama kali lewat AppTest (first paint)
+    for page, module in PAGES.items():
+        import_line = f'import {module}' if module else 'import streamlit'
+        script = STARTUP_SCRIPT.format(import_line=import_line, page=page)
+        results = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+            results.append([float(value) for value in output.split()[-2:]])
+        cold, paint = np.min(results, axis=0)
+        print(f"startup  page={page:<10}  cold import {cold * 1000:8.1f} ms  first paint {paint * 1000:8.1f} ms")
+
+
+BENCHMARKS = {
+    'rfm': bench_rfm,
+    'parallel': bench_parallel,
+    'sketch': bench_sketch,
+    'startup': bench_startup,
+    'memory': bench_memory,
+    'migration': bench_migration,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RFM pipeline")
+    parser.add_argument('names', nargs='*', help=f"benchmark yang dijalankan: {', '.join(BENCHMARKS)} (default: semua)")
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name](args.sizes, args.repeat)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+import streamlit as st
+
+from profiling import current, stage
+
+# Layer rendering chart untuk dashboard: scatter otomatis pindah ke WebGL atau density yang di-bin di server
+# bila titiknya terlalu banyak, kategori kecil digabung ke "Other", dan waktu render serta ukuran payload dicatat
+# sebagai tahap profiling.
+
+WEBGL_POINT_LIMIT = 5_000  # di atas ini scatter memakai scattergl
+DENSITY_POINT_LIMIT = 200_000  # di atas ini scatter diganti density 2-D yang di-bin di server
+DENSITY_BINS = 200
+TOP_N = 50  # jumlah kategori (misalnya _ProductID) yang ditampilkan sebelum sisanya digabung ke "Other"
+OTHER = 'Other'
+
+
+def top_n(df, label, value, n=TOP_N, within=None, other=OTHER):
+    # Menyimpan n label dengan total value terbesar (per grup `within` bila diberikan), sisanya digabung ke `other`
+    within = list(within or [])
+    totals = df.groupby(within + [label], observed=True)[value].sum()
+    ranks = (totals.groupby(level=within, observed=True) if within else totals).rank(method='first', ascending=False)
+    top = ranks[ranks <= n].index
+    is_top = pd.MultiIndex.from_frame(df[within + [label]]).isin(top) if within else df[label].isin(top)
+    if is_top.all():
+        return df
+    keys = [col for col in df.columns if col != value]
+    df = df.assign(**{label: df[label].astype(str).where(is_top, other)})
+    return df.groupby(keys, observed=True, sort=False)[value].sum().reset_index()
+
+
+def scatter(df, x, y, color=None, webgl_limit=WEBGL_POINT_LIMIT, density_limit=DENSITY_POINT_LIMIT, bins=DENSITY_BINS, **kwargs):
+    if len(df) <= density_limit:
+        render_mode = 'webgl' if len(df) > webgl_limit else 'svg'
+        return px.scatter(df, x=x, y=y, color=color, render_mode=render_mode, **kwargs)
+
+    # Terlalu banyak titik: hitung histogram 2-D di server dan kirim sebagai heatmap, satu panel per nilai `color`
+    # dengan bin dan skala warna yang sama supaya panel bisa dibandingkan
+    groups = [(None, np.ones(len(df), dtype=bool))] if color is None else \
+        [(value, (df[color] == value).to_numpy()) for value in df[color].drop_duplicates().sort_values()]
+    x_values = df[x].to_numpy(dtype=np.float64)
+    y_values = df[y].to_numpy(dtype=np.float64)
+    x_edges = np.histogram_bin_edges(x_values, max(20, bins // len(groups)))  # panel lebih sempit, bin x lebih sedikit
+    y_edges = np.histogram_bin_edges(y_values, bins)
+    labels = kwargs.get('labels', {})
+    fig = make_subplots(rows=1, cols=len(groups), shared_yaxes=True,
+                        subplot_titles=[str(value) for value, _ in groups] if color is not None else None)
+    for col, (value, mask) in enumerate(groups, start=1):
+        counts = np.histogram2d(x_values[mask], y_values[mask], bins=[x_edges, y_edges])[0]
+        counts = np.where(counts > 0, counts, np.nan).astype(np.float32)
+        fig.add_trace(go.Heatmap(z=np.log10(counts.T), x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+                                 customdata=counts.T, coloraxis='coloraxis', name=str(value),
+                                 hovertemplate='%{x:,.0f}, %{y:,.0f}<br>Customers: %{customdata:,}<extra>%{fullData.name}</extra>'),
+                      row=1, col=col)
+        fig.update_xaxes(title_text=labels.get(x, x), row=1, col=col)
+    fig.update_yaxes(title_text=labels.get(y, y), row=1, col=1)
+    fig.update_layout(title=f"{kwargs.get('title', '')} ({len(df):,} points, binned)",
+                      coloraxis={'colorscale': 'Viridis', 'colorbar': {'title': 'Customers (log10)'}})
+    return fig
+
+
+def plot(fig, name):
+    # Menampilkan chart sebagai tahap chart.<name>; ukuran payload JSON hanya diukur saat profiling aktif
+    # (di luar waktu tahap), supaya figure tidak diserialisasi dua kali pada rerun biasa
+    with stage(f'chart.{name}') as record:
+        st.plotly_chart(fig)
+    if current().enabled:
+        record['payload_bytes'] = len(fig.to_json())
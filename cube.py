@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from eda import sales_summary
+from profiling import profiled
+from rfm import customer_segments, to_cents
+from rfm_cache import MEMORY_ENTRIES
+
+# Cube agregat tanggal x Sales Channel x _ProductID x Customer Segment untuk dashboard. Cube dibangun sekali per
+# versi dataset; filter tanggal dan segmen cukup memotong cube sehingga latensi tidak tergantung jumlah order.
+# Ada dua tingkat: rollup per bulan untuk bulan yang tercakup penuh oleh rentang tanggal, dan cell per hari hanya
+# untuk bulan awal/akhir yang terpotong, jadi filter "Select Start/End Date" tetap sama persis.
+
+CUBE_KEYS = ['OrderDate', 'Sales Channel', '_ProductID', 'Customer Segment']
+HLL_PRECISION = 12
+
+
+def _bit_length(values):
+    # Panjang bit untuk array uint64 (vectorized binary search)
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= (np.uint64(1) << np.uint64(shift))
+        length[mask] += shift
+        values[mask] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+class DistinctCustomers:
+    # Himpunan pelanggan unik per hari yang bisa di-merge (union) untuk rentang tanggal mana pun.
+    # Bila jumlah pelanggan kecil dipakai bitmap exact, selain itu HyperLogLog dengan ukuran register yang sama.
+
+    def __init__(self, day_index, customers, n_days, precision=HLL_PRECISION):
+        pairs = pd.DataFrame({'day': day_index, 'customer': customers}).drop_duplicates()
+        codes, uniques = pd.factorize(pairs['customer'])
+        m = 1 << precision
+        self.exact = len(uniques) <= 8 * m
+        day = pairs['day'].to_numpy()
+        if self.exact:
+            self.registers = np.zeros((n_days, (len(uniques) + 7) // 8), dtype=np.uint8)
+            np.bitwise_or.at(self.registers, (day, codes >> 3), (1 << (codes & 7)).astype(np.uint8))
+        else:
+            hashed = pd.util.hash_array(pairs['customer'].to_numpy())
+            index = (hashed >> np.uint64(64 - precision)).astype(np.int64)
+            remaining = hashed & np.uint64((1 << (64 - precision)) - 1)
+            rank = (64 - precision + 1 - _bit_length(remaining)).astype(np.uint8)
+            self.registers = np.zeros((n_days, m), dtype=np.uint8)
+            np.maximum.at(self.registers, (day, index), rank)
+
+    def count(self, days):
+        if not len(days):
+            return 0
+        if self.exact:
+            return int(np.unpackbits(np.bitwise_or.reduce(self.registers[days], axis=0)).sum())
+        registers = self.registers[days].max(axis=0)
+        m = len(registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+        zeros = np.count_nonzero(registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class SalesCube:
+
+    def __init__(self, df, rfm_table):
+        day = df['OrderDate'].dt.floor('D')
+        frame = pd.DataFrame({
+            'OrderDate': day,
+            'Sales Channel': df['Sales Channel'],
+            '_ProductID': df['_ProductID'],
+            'Customer Segment': customer_segments(df['_CustomerID'], rfm_table),
+            'Sales': to_cents(df['Sales per Order']),
+            'Profit': to_cents(df['Profit per Order']),
+            'Order Quantity': df['Order Quantity'],
+        })
+        # Order setelah tanggal referensi tidak punya segmen; dropna=False supaya tetap ikut di trend dan volume
+        self.cells = frame.groupby(CUBE_KEYS, observed=True, dropna=False).sum().reset_index()
+        month = self.cells['OrderDate'].to_numpy().astype('datetime64[M]').astype(self.cells['OrderDate'].dtype)
+        self.month_cells = self.cells.groupby([pd.Series(month, name='OrderDate'), *CUBE_KEYS[1:]],
+                                              observed=True, dropna=False).sum(numeric_only=True).reset_index()
+        self.days = np.sort(day.unique())
+        self.customers = DistinctCustomers(np.searchsorted(self.days, day), df['_CustomerID'].to_numpy(), len(self.days))
+        self.summary = sales_summary(df)
+        self.min_date = self.days[0]
+        self.max_date = self.days[-1]
+
+    @staticmethod
+    def _slice(cells, start, end):
+        # Baris dengan start <= OrderDate <= end (cells terurut per OrderDate)
+        dates = cells['OrderDate'].to_numpy()
+        lo = np.searchsorted(dates, np.datetime64(start, 'D').astype(dates.dtype), side='left')
+        hi = np.searchsorted(dates, np.datetime64(end, 'D').astype(dates.dtype), side='right')
+        return cells.iloc[lo:hi]
+
+    def _cells(self, start=None, end=None, segments=None):
+        if start is None and end is None:
+            cells = self.month_cells
+        else:
+            start = pd.Timestamp(self.min_date if start is None else start).floor('D')
+            end = pd.Timestamp(self.max_date if end is None else end).floor('D')
+            first_full = (start - pd.Timedelta(days=1)).to_period('M') + 1  # bulan pertama yang mulai >= start
+            last_full = (end + pd.Timedelta(days=1)).to_period('M') - 1  # bulan terakhir yang selesai <= end
+            if first_full <= last_full:
+                one_day = pd.Timedelta(days=1)
+                cells = pd.concat([self._slice(self.cells, start, first_full.start_time - one_day),
+                                   self._slice(self.month_cells, first_full.start_time, last_full.start_time),
+                                   self._slice(self.cells, (last_full + 1).start_time, end)], ignore_index=True)
+            else:
+                cells = self._slice(self.cells, start, end)
+        if segments:
+            cells = cells[cells['Customer Segment'].isin(segments)]
+        return cells
+
+    # Query dengan hasil yang sama seperti fungsi-fungsi di eda untuk df yang difilter tanggal
+
+    @profiled('cube.sales_trend')
+    def sales_trend(self, start=None, end=None):
+        cells = self._cells(start, end)
+        trend = cells.groupby(cells['OrderDate'].dt.to_period('M'))['Sales'].sum() / 100
+        return trend.rename('Sales per Order').reset_index()
+
+    @profiled('cube.customers_trend')
+    def customers_trend(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.days, np.datetime64(start), side='left')
+        hi = len(self.days) if end is None else np.searchsorted(self.days, np.datetime64(end), side='right')
+        months = pd.Series(np.arange(lo, hi)).groupby(pd.DatetimeIndex(self.days[lo:hi]).to_period('M'))
+        trend = months.apply(lambda days: self.customers.count(days.to_numpy())).astype(np.int64)
+        return trend.rename('_CustomerID').rename_axis('OrderDate').reset_index()
+
+    @profiled('cube.sales_volume')
+    def sales_volume(self, start=None, end=None):
+        cells = self._cells(start, end)
+        return cells.groupby(['Sales Channel', '_ProductID'], observed=True)['Order Quantity'].sum().reset_index()
+
+    # Query untuk tab segmen (tanpa filter tanggal)
+
+    @profiled('cube.sales_by_product')
+    def sales_by_product(self, segments=None):
+        cells = self._cells(segments=segments)
+        return cells.groupby(['_ProductID', 'Customer Segment'], observed=True)['Order Quantity'].sum().reset_index()
+
+    @profiled('cube.sales_by_channel')
+    def sales_by_channel(self, segments=None):
+        cells = self._cells(segments=segments)
+        return cells.groupby(['Sales Channel', 'Customer Segment'], observed=True)['Order Quantity'].sum().reset_index()
+
+    @profiled('cube.sales_by_segment')
+    def sales_by_segment(self, segments=None):
+        cells = self._cells(segments=segments)
+        totals = cells.groupby('Customer Segment', observed=True)[['Sales', 'Profit']].sum() / 100
+        return totals.rename(columns={'Sales': 'Sales per Order', 'Profit': 'Profit per Order'}).reset_index()
+
+
+@st.cache_resource(show_spinner=False, max_entries=MEMORY_ENTRIES)
+def load_cube(_df, _rfm_table, version):
+    # version (fingerprint dataset + tanggal referensi) menjadi cache key; df dan rfm_table tidak di-hash
+    return SalesCube(_df, _rfm_table)
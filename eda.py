@@ -0,0 +1,30 @@
+import pandas as pd
+
+from rfm import to_cents
+
+# Agregat untuk bagian "Simple EDA" (Sales Dashboard Performance)
+
+
+def sales_summary(df):
+    return {
+        'total_revenue': to_cents(df['Sales per Order']).sum() / 100,
+        'total_orders': df['OrderNumber'].nunique(),
+        'sales_volume': int(df['Order Quantity'].sum()),
+        'total_profit': to_cents(df['Profit per Order']).sum() / 100,
+        'total_customers': df['_CustomerID'].nunique(),
+    }
+
+
+def sales_trend(df):
+    month = df['OrderDate'].dt.to_period('M')
+    cents = pd.Series(to_cents(df['Sales per Order']), index=df.index)
+    trend = (cents.groupby(month).sum() / 100).rename('Sales per Order')
+    return trend.rename_axis('OrderDate').reset_index()
+
+
+def customers_trend(df):
+    return df.groupby(df['OrderDate'].dt.to_period('M'))['_CustomerID'].nunique().reset_index()
+
+
+def sales_volume(df):
+    return df.groupby(['Sales Channel', '_ProductID'], observed=True)['Order Quantity'].sum().reset_index()
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import re
+
+import pandas as pd
+import streamlit as st
+
+from rfm import add_order_metrics, downcast_money
+
+DATA_PATH = 'US_Regional_Sales_Data.csv'
+SIDECAR_DIR = '.rfm_cache'
+SCHEMA_VERSION = 2  # naikkan bila DTYPES atau cara parsing berubah supaya sidecar lama tidak terpakai
+
+# Skema eksplisit untuk dataset penjualan
+DTYPES = {
+    'OrderNumber': 'string',
+    'Sales Channel': 'category',
+    'WarehouseCode': 'category',
+    'CurrencyCode': 'category',
+    '_SalesTeamID': 'int32',
+    '_CustomerID': 'int32',
+    '_StoreID': 'int32',
+    '_ProductID': 'int32',
+    'Order Quantity': 'int32',
+    'Discount Applied': 'float64',
+    'Unit Cost': 'float64',
+    'Unit Price': 'float64',
+}
+DATE_COLUMNS = ['ProcuredDate', 'OrderDate', 'ShipDate', 'DeliveryDate']
+DATE_FORMAT = '%d/%m/%y'  # dayfirst, contoh: 31/5/18
+MONEY_COLUMNS = ['Unit Cost', 'Unit Price']
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def parse_sales_csv(path, **kwargs):
+    # Parsing CSV dengan skema di atas; angka seperti "1,001.18" dibaca sebagai 1001.18
+    df = pd.read_csv(path, dtype=DTYPES, thousands=',', encoding='utf-8-sig', **kwargs)
+    return downcast_money(coerce_dates(df), MONEY_COLUMNS)
+
+
+def iter_sales_chunks(path=DATA_PATH, chunksize=100_000):
+    # Generator chunk DataFrame dengan skema yang sama seperti parse_sales_csv
+    with pd.read_csv(path, dtype=DTYPES, thousands=',', encoding='utf-8-sig', chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield downcast_money(coerce_dates(chunk), MONEY_COLUMNS)
+
+
+def coerce_dates(df):
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT)
+    return df
+
+
+def sidecar_path(path, digest):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(path) or '.', SIDECAR_DIR, f'{stem}.{digest[:16]}.v{SCHEMA_VERSION}.parquet')
+
+
+def _read_sidecar(path):
+    try:
+        return pd.read_parquet(path)
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def _remove_stale_sidecars(path):
+    # Sidecar lain untuk stem yang sama (isi CSV atau SCHEMA_VERSION lama) tidak akan terpakai lagi
+    directory, name = os.path.split(path)
+    stem = name.rsplit('.', 3)[0]
+    pattern = re.compile(rf'{re.escape(stem)}\.[0-9a-f]{{16}}\.v\d+\.parquet')
+    for other in os.listdir(directory):
+        if other != name and pattern.fullmatch(other):
+            try:
+                os.remove(os.path.join(directory, other))
+            except OSError:
+                pass
+
+
+def _write_sidecar(df, path):
+    # Parquet membutuhkan pyarrow; tanpa pyarrow sidecar dilewati saja
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        _remove_stale_sidecars(path)
+    except (ImportError, OSError):
+        pass
+
+
+def read_sales(path=DATA_PATH, digest=None):
+    # Baca dari sidecar Parquet bila isi CSV belum berubah, selain itu parse ulang CSV.
+    # digest opsional: hash file yang sudah dihitung pemanggil, supaya CSV tidak di-hash dua kali
+    digest = digest or file_hash(path)
+    sidecar = sidecar_path(path, digest)
+    if os.path.exists(sidecar):
+        df = _read_sidecar(sidecar)
+        if df is not None:
+            return df
+    df = parse_sales_csv(path)
+    _write_sidecar(df, sidecar)
+    return df
+
+
+@st.cache_data(show_spinner=False)
+def _cached_hash(path, mtime):
+    return file_hash(path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cached_orders(path, mtime):
+    # mtime hanya dipakai sebagai bagian dari cache key Streamlit; hash file dibagi dengan dataset_fingerprint
+    return add_order_metrics(read_sales(path, _cached_hash(path, mtime)))
+
+
+def load_orders(path=DATA_PATH):
+    # Frame order lengkap dengan 'Sales per Order' dan 'Profit per Order', dihitung sekali per versi file.
+    # Objek yang sama dibagikan ke semua sesi dan rerun tanpa copy, jadi pemanggil tidak boleh memodifikasinya
+    return _cached_orders(path, os.path.getmtime(path))
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _cached_date_range(path, mtime):
+    dates = _cached_orders(path, mtime)['OrderDate']
+    return dates.min(), dates.max()
+
+
+def order_date_range(path=DATA_PATH):
+    # (OrderDate pertama, OrderDate terakhir), dihitung sekali per versi file
+    return _cached_date_range(path, os.path.getmtime(path))
+
+
+def dataset_fingerprint(path=DATA_PATH):
+    # Hash isi file (dihitung ulang hanya bila mtime berubah), dipakai sebagai cache key turunan (cube, hasil RFM)
+    return _cached_hash(path, os.path.getmtime(path))
@@ -1,14 +1,29 @@
+import math
+
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-import numpy as np
+
+import charts
+import profiling
+from cube import load_cube
+from loader import dataset_fingerprint, load_orders, order_date_range
+from migration import load_snapshots, sankey_figure, transition_matrix
+from rfm import REFERENCE_DATE, SEGMENTS
+from rfm_cache import load_rfm
+from rfm_index import PAGE_SIZE, load_rfm_index
 
 # Menampilkan semua baris dan kolom
 pd.set_option('display.max_rows', None)
 pd.set_option('display.max_columns', None)
 
 def project():
-    # Latar Belakang
+    # Profiling per tahap bila server dijalankan dengan RFM_PROFILE=1; panel debug muncul di sidebar
+    with profiling.run() as profiler:
+        _project(profiler)
+
+
+def _project(profiler):
     # Latar Belakang
     st.markdown("<h1 style='text-align: center;'>Segmentasi Pelanggan dengan RFM</h1>", unsafe_allow_html=True)
     st.markdown("<h2 style='text-align: left;'>Latar Belakang</h2>", unsafe_allow_html=True)
@@ -16,8 +31,15 @@ def project():
     st.markdown("<div style='text-align: justify;'>Metode RFM ini akan diterapkan pada dataset penjualan yang mencakup berbagai saluran penjualan dan produk untuk mengidentifikasi segmen-segmen pelanggan yang dapat digunakan untuk perencanaan pemasaran lebih lanjut.</div>", unsafe_allow_html=True)
     st.markdown("<div style='text-align: justify;'>   </div>", unsafe_allow_html=True)
 
+    # Load the data (sudah termasuk kolom 'Sales per Order' dan 'Profit per Order'; frame cache tidak boleh dimodifikasi)
+    with profiler.stage('load_orders') as record:
+        df = load_orders()
+        record['rows_out'] = len(df)
+
     # Eksplorasi Data
-    with st.expander("Data Understanding"):
+    # Isi yang berat hanya dijalankan saat expander dibuka (on_change="rerun" membuat status open ter-track)
+    data_expander = st.expander("Data Understanding", key="data_understanding_expander", on_change="rerun")
+    with data_expander:
         st.write('**OrderNumber**: A unique identifier for each order.')
         st.write('**Sales Channel**: The channel through which the sale was made (In-Store, Online, Distributor, Wholesale).')
         st.write('**WarehouseCode**: Code representing the warehouse involved in the order.')
@@ -34,88 +56,93 @@ def project():
         st.write('**Unit Cost**: Cost of a single unit of the product.')
         st.write('**Unit Price**: Price at which the product was sold.')
 
-        # Load the data
-        df = pd.read_csv('US_Regional_Sales_Data.csv')
-        st.markdown("<h4 style='text-align: justify;'>📊 Datasets</h2>", unsafe_allow_html=True)
-        st.dataframe(df)
-        info_df = pd.DataFrame({"Kolom": df.columns,"Non-Null Count": df.notnull().sum().values,
-                                "Tipe Data": df.dtypes.values})
-        st.markdown("<h4 style='text-align: justify;'>📋 Informasi Struktur Datasets</h2>", unsafe_allow_html=True)
-        st.dataframe(info_df)
-
-    # Mengonversi kolom yang diperlukan menjadi tipe data numerik
-    df['Order Quantity'] = pd.to_numeric(df['Order Quantity'], errors='coerce')
-    df['Unit Price'] = pd.to_numeric(df['Unit Price'], errors='coerce')
-    df['Discount Applied'] = pd.to_numeric(df['Discount Applied'], errors='coerce')
-    df['Unit Cost'] = pd.to_numeric(df['Unit Cost'], errors='coerce')
-
-    # Mengonversi OrderDate ke datetime
-    df['OrderDate'] = pd.to_datetime(df['OrderDate'])
-
-    # Membuat kolom 'Sales per Order' dan 'Profit per Order'
-    df['Sales per Order'] = round(df['Order Quantity'] * df['Unit Price'] * (1 - df['Discount Applied']), 2)
-    df['Profit per Order'] = round(df['Sales per Order'] - (df['Order Quantity'] * df['Unit Cost']), 2)
+        if data_expander.open:
+            st.markdown("<h4 style='text-align: justify;'>📊 Datasets</h2>", unsafe_allow_html=True)
+            raw_df = df.drop(columns=['Sales per Order', 'Profit per Order'])
+            st.dataframe(raw_df)
+            info_df = pd.DataFrame({"Kolom": raw_df.columns,"Non-Null Count": raw_df.notnull().sum().values,
+                                    "Tipe Data": raw_df.dtypes.astype(str).values})
+            st.markdown("<h4 style='text-align: justify;'>📋 Informasi Struktur Datasets</h2>", unsafe_allow_html=True)
+            st.dataframe(info_df)
+
+    # Tanggal referensi untuk Recency; setiap tanggal punya hasil RFM sendiri di cache.
+    # Order pada/setelah tanggal referensi tidak dihitung, jadi minimal harus ada satu hari order sebelumnya
+    first_order, last_order = order_date_range()
+    min_reference = (first_order + pd.Timedelta(days=1)).date()
+    max_reference = max(REFERENCE_DATE, last_order + pd.Timedelta(days=1)).date()
+    reference_date = pd.Timestamp(st.sidebar.date_input("Reference Date (Recency)", max(REFERENCE_DATE.date(), min_reference),
+                                                        min_value=min_reference, max_value=max_reference, key="reference_date"))
+
+    # Create RFM Table dan cube agregat untuk dashboard (dihitung sekali per versi dataset dan tanggal referensi)
+    version = (dataset_fingerprint(), reference_date)
+    with profiler.stage('rfm', len(df)) as record:
+        rfm_table = load_rfm(df, *version)
+        record['rows_out'] = len(rfm_table)
+    with profiler.stage('cube', len(df)) as record:
+        cube = load_cube(df, rfm_table, version)
+        record['rows_out'] = len(cube.cells)
 
     # Sales Dashboard Performance
-    with st.expander("Simple EDA"):
-        total_revenue = df['Sales per Order'].sum()
-        total_orders = df['OrderNumber'].nunique()
-        sales_volume = df['Order Quantity'].sum()
-        total_profit = df['Profit per Order'].sum()
-        total_customers = df['_CustomerID'].nunique()
-
-        # Formatting for large numbers with K, M, B suffix
-        def format_large_numbers(num):
-            if num >= 1e9:
-                return f"${num/1e9:.2f}B"
-            elif num >= 1e6:
-                return f"${num/1e6:.2f}M"
-            elif num >= 1e3:
-                return f"${num/1e3:.2f}K"
-            else:
-                return f"${num:.2f}"
-
-        st.markdown("<h4 style='text-align: center;'>Sales Dashboard Performance</h4>", unsafe_allow_html=True)
-        st.markdown("<h6 style='text-align: left;'>Summary</h6>", unsafe_allow_html=True)
-
-        # Metrik Total
-        col1, col2, col3, col4, col5 = st.columns(5)
-        col1.metric("Total Revenue", format_large_numbers(total_revenue))
-        col2.metric("Total Orders", f"{total_orders:,}")
-        col3.metric("Sales Volume", f"{sales_volume:,}")
-        col4.metric("Total Profit", format_large_numbers(total_profit))
-        col5.metric("Total Customers", f"{total_customers}")
-
-        # Menambahkan filter untuk memilih periode waktu
-        min_date = pd.to_datetime(df['OrderDate']).min()
-        max_date = pd.to_datetime(df['OrderDate']).max()
-        start_date = st.date_input("Select Start Date", min_date, min_value=min_date, max_value=max_date)
-        end_date = st.date_input("Select End Date", max_date, min_value=min_date, max_value=max_date)
-
-        start_date = pd.to_datetime(start_date)
-        end_date = pd.to_datetime(end_date)
-
-        df_filtered = df[(df['OrderDate'] >= start_date) & (df['OrderDate'] <= end_date)]
-
-        # Visualizations (Sales Trend, Customers Trend, Sales Volume by Sales Channel)
-        sales_trend = df_filtered.groupby(df_filtered['OrderDate'].dt.to_period('M'))['Sales per Order'].sum().reset_index()
-        sales_trend['OrderDate'] = sales_trend['OrderDate'].dt.strftime('%b %Y')  # Convert Period to string
-        fig_sales_trend = px.line(sales_trend, x='OrderDate', y='Sales per Order', title="Sales Trend", labels={'OrderDate': 'Date', 'Sales per Order': 'Revenue'})
-        st.plotly_chart(fig_sales_trend)
-
-        # Line Chart: Customers Trend
-        customers_trend = df_filtered.groupby(df_filtered['OrderDate'].dt.to_period('M'))['_CustomerID'].nunique().reset_index()
-        customers_trend['OrderDate'] = customers_trend['OrderDate'].dt.strftime('%b %Y')  # Convert Period to string
-        fig_customers_trend = px.line(customers_trend, x='OrderDate', y='_CustomerID', title="Customers Trend", labels={'OrderDate': 'Date', '_CustomerID': 
-                                                                                                                        'Number of Customers'})
-        st.plotly_chart(fig_customers_trend)
-
-        # Treemap: Sales Volume by Sales Channel and Product ID
-        df_sales_volume = df_filtered.groupby(['Sales Channel', '_ProductID'])['Order Quantity'].sum().reset_index()
-        fig_sales_volume = px.treemap(df_sales_volume, path=['Sales Channel', '_ProductID'], values='Order Quantity', color='Order Quantity', 
-                                      title="Sales Volume by Sales Channel and Product")
-        fig_sales_volume.update_traces(hovertemplate="<b>%{label}</b><br>Sales Channel: %{parent}<br>_ProductID: %{id}<br>Order Quantity Sum: %{value}")
-        st.plotly_chart(fig_sales_volume)
+    eda_expander = st.expander("Simple EDA", key="simple_eda_expander", on_change="rerun")
+    with eda_expander:
+        if eda_expander.open:
+            summary = cube.summary
+            total_revenue = summary['total_revenue']
+            total_orders = summary['total_orders']
+            sales_volume = summary['sales_volume']
+            total_profit = summary['total_profit']
+            total_customers = summary['total_customers']
+
+            # Formatting for large numbers with K, M, B suffix
+            def format_large_numbers(num):
+                if num >= 1e9:
+                    return f"${num/1e9:.2f}B"
+                elif num >= 1e6:
+                    return f"${num/1e6:.2f}M"
+                elif num >= 1e3:
+                    return f"${num/1e3:.2f}K"
+                else:
+                    return f"${num:.2f}"
+
+            st.markdown("<h4 style='text-align: center;'>Sales Dashboard Performance</h4>", unsafe_allow_html=True)
+            st.markdown("<h6 style='text-align: left;'>Summary</h6>", unsafe_allow_html=True)
+
+            # Metrik Total
+            col1, col2, col3, col4, col5 = st.columns(5)
+            col1.metric("Total Revenue", format_large_numbers(total_revenue))
+            col2.metric("Total Orders", f"{total_orders:,}")
+            col3.metric("Sales Volume", f"{sales_volume:,}")
+            col4.metric("Total Profit", format_large_numbers(total_profit))
+            col5.metric("Total Customers", f"{total_customers}")
+
+            # Menambahkan filter untuk memilih periode waktu
+            min_date = pd.to_datetime(cube.min_date)
+            max_date = pd.to_datetime(cube.max_date)
+            start_date = st.date_input("Select Start Date", min_date, min_value=min_date, max_value=max_date)
+            end_date = st.date_input("Select End Date", max_date, min_value=min_date, max_value=max_date)
+
+            start_date = pd.to_datetime(start_date)
+            end_date = pd.to_datetime(end_date)
+
+            # Visualizations (Sales Trend, Customers Trend, Sales Volume by Sales Channel)
+            sales_trend = cube.sales_trend(start_date, end_date)
+            sales_trend['OrderDate'] = sales_trend['OrderDate'].dt.strftime('%b %Y')  # Convert Period to string
+            fig_sales_trend = px.line(sales_trend, x='OrderDate', y='Sales per Order', title="Sales Trend", labels={'OrderDate': 'Date', 'Sales per Order': 'Revenue'})
+            charts.plot(fig_sales_trend, 'sales_trend')
+
+            # Line Chart: Customers Trend
+            customers_trend = cube.customers_trend(start_date, end_date)
+            customers_trend['OrderDate'] = customers_trend['OrderDate'].dt.strftime('%b %Y')  # Convert Period to string
+            fig_customers_trend = px.line(customers_trend, x='OrderDate', y='_CustomerID', title="Customers Trend", labels={'OrderDate': 'Date', '_CustomerID': 
+                                                                                                                            'Number of Customers'})
+            charts.plot(fig_customers_trend, 'customers_trend')
+
+            # Treemap: Sales Volume by Sales Channel and Product ID
+            df_sales_volume = charts.top_n(cube.sales_volume(start_date, end_date), '_ProductID', 'Order Quantity', within=['Sales Channel'])
+            fig_sales_volume = px.treemap(df_sales_volume, path=['Sales Channel', '_ProductID'], values='Order Quantity', color='Order Quantity', 
+                                          title="Sales Volume by Sales Channel and Product")
+            fig_sales_volume.update_traces(hovertemplate="<b>%{label}</b><br>Sales Channel: %{parent}<br>_ProductID: %{id}<br>Order Quantity Sum: %{value}")
+            charts.plot(fig_sales_volume, 'sales_volume')
 
     # RFM Analysis
     st.markdown("<h2 style='text-align: left;'>Analisis RFM</h2>", unsafe_allow_html=True)
@@ -138,88 +165,64 @@ def project():
     st.markdown("<div style='text-align: justify;'>Berdasarkan RFM Score, pelanggan dapat dikelompokkan ke dalam beberapa segmen, antara lain:</div>", unsafe_allow_html=True)
     st.markdown("<ul><li>Champions (Skor 511 - 555): Pelanggan dengan skor tinggi di semua kategori.</li><li>Loyal (Skor 451 - 510): Pelanggan yang setia dan sering bertransaksi.</li><li>Potential (Skor 351 - 450): Pelanggan yang potensial namun perlu lebih banyak interaksi.</li><li>At Risk (Skor 151 - 350): Pelanggan yang berisiko hilang namun masih memiliki potensi tinggi.</li><li>Uncategorized (Skor di bawah 150): Pelanggan yang tidak masuk ke kategori lainnya.</li></ul>", unsafe_allow_html=True)
 
-    # Create RFM Table
-    rfm_table = df.groupby('_CustomerID').agg(Last_Transaction=('OrderDate', 'max'),Frequency=('OrderNumber', 'nunique'),
-                    Monetary=('Sales per Order', 'sum')).reset_index()
-
-    rfm_table['Recency'] = (pd.to_datetime('2021-01-01') - rfm_table['Last_Transaction']).dt.days
-
-    recency_percentiles = np.percentile(rfm_table['Recency'], [20, 40, 60, 80])
-    rfm_table['R Score'] = pd.cut(rfm_table['Recency'], bins=[0, recency_percentiles[0], recency_percentiles[1], recency_percentiles[2], 
-                                                              recency_percentiles[3], np.inf], labels=[5, 4, 3, 2, 1], right=False)
-
-    frequency_percentiles = np.percentile(rfm_table['Frequency'], [20, 40, 60, 80])
-    rfm_table['F Score'] = pd.cut(rfm_table['Frequency'], bins=[0, frequency_percentiles[0], frequency_percentiles[1], frequency_percentiles[2], 
-                                                                frequency_percentiles[3], np.inf], labels=[1, 2, 3, 4, 5], right=False)
-
-    monetary_percentiles = np.percentile(rfm_table['Monetary'], [20, 40, 60, 80])
-    rfm_table['M Score'] = pd.cut(rfm_table['Monetary'], bins=[0, monetary_percentiles[0], monetary_percentiles[1], monetary_percentiles[2], 
-                                                               monetary_percentiles[3], np.inf], labels=[1, 2, 3, 4, 5], right=False)
-
-    rfm_table['RFM Score'] = rfm_table['R Score'].astype(str) + rfm_table['F Score'].astype(str) + rfm_table['M Score'].astype(str)
-
-    def customer_segment(rfm_score):
-        if rfm_score >= "511" and rfm_score <= "555":
-            return "Champions"
-        elif rfm_score >= "451" and rfm_score <= "510":
-            return "Loyal"
-        elif rfm_score >= "351" and rfm_score <= "450":
-            return "Potential"
-        elif rfm_score >= "151" and rfm_score <= "350":
-            return "At Risk"
-        else:
-            return "Uncategorized"
-
-    rfm_table['Customer Segment'] = rfm_table['RFM Score'].apply(customer_segment)
-
     # Display RFM Table with range sliders for Recency, Frequency, and Monetary
-    recency_range = st.slider("Select Recency Range", min_value=int(rfm_table['Recency'].min()), max_value=int(rfm_table['Recency'].max()), 
-                              value=(int(rfm_table['Recency'].min()), int(rfm_table['Recency'].max())), key="recency_slider")
-    frequency_range = st.slider("Select Frequency Range", min_value=int(rfm_table['Frequency'].min()), max_value=int(rfm_table['Frequency'].max()), 
-                                value=(int(rfm_table['Frequency'].min()), int(rfm_table['Frequency'].max())), key="frequency_slider")
-    monetary_range = st.slider("Select Monetary Range", min_value=int(rfm_table['Monetary'].min()), max_value=int(rfm_table['Monetary'].max()), 
-                               value=(int(rfm_table['Monetary'].min()), int(rfm_table['Monetary'].max())), key="monetary_slider")
-
-    # Filter the data based on the sliders
-    filtered_rfm = rfm_table[
-        (rfm_table['Recency'] >= recency_range[0]) & (rfm_table['Recency'] <= recency_range[1]) &
-        (rfm_table['Frequency'] >= frequency_range[0]) & (rfm_table['Frequency'] <= frequency_range[1]) &
-        (rfm_table['Monetary'] >= monetary_range[0]) & (rfm_table['Monetary'] <= monetary_range[1])
-    ]
-
-    # Display filtered data
-    st.write("Filtered RFM Table based on the selected ranges:")
-    st.dataframe(filtered_rfm)
-
-    # Merge RFM data into the main dataframe for visualization
-    df = df.merge(rfm_table[['_CustomerID', 'Customer Segment']], on='_CustomerID', how='left')
+    with profiler.stage('rfm_index', len(rfm_table)) as record:
+        rfm_index = load_rfm_index(rfm_table, version)
+        record['rows_out'] = len(rfm_index)
+
+    def slider_bounds(col):
+        # Batas slider bilangan bulat yang mencakup semua nilai; max dibulatkan ke atas supaya top spender ikut
+        lo, hi = rfm_index.bounds(col)
+        return math.floor(lo), math.ceil(hi)
+
+    recency_min, recency_max = slider_bounds('Recency')
+    frequency_min, frequency_max = slider_bounds('Frequency')
+    monetary_min, monetary_max = slider_bounds('Monetary')
+    recency_range = st.slider("Select Recency Range", min_value=recency_min, max_value=recency_max, 
+                              value=(recency_min, recency_max), key="recency_slider")
+    frequency_range = st.slider("Select Frequency Range", min_value=frequency_min, max_value=frequency_max, 
+                                value=(frequency_min, frequency_max), key="frequency_slider")
+    monetary_range = st.slider("Select Monetary Range", min_value=monetary_min, max_value=monetary_max, 
+                               value=(monetary_min, monetary_max), key="monetary_slider")
+
+    # Filter the data based on the sliders (range query lewat index, tanpa scan penuh)
+    with profiler.stage('rfm_index.query', len(rfm_index)) as record:
+        filtered_rows = rfm_index.query({'Recency': recency_range, 'Frequency': frequency_range, 'Monetary': monetary_range})
+        record['rows_out'] = len(filtered_rows)
+
+    # Display filtered data, hanya halaman yang sedang dilihat yang dikirim ke browser
+    pages = max(1, -(-len(filtered_rows) // PAGE_SIZE))
+    st.write(f"Filtered RFM Table based on the selected ranges: {len(filtered_rows):,} of {len(rfm_index):,} customers")
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="rfm_page") if pages > 1 else 1
+    st.dataframe(rfm_index.page(filtered_rows, page - 1))
 
     # Visualizations based on the selected segment
     segment_filter = st.multiselect(
         "Select Customer Segment", 
-        options=["Champions", "Loyal", "Potential", "At Risk", "Uncategorized"],
+        options=SEGMENTS,
         default=["Champions", "Loyal"])
 
     # Memfilter data berdasarkan pilihan multi select
-    if segment_filter:
-        df = df[df['Customer Segment'].isin(segment_filter)]
+    with profiler.stage('segment_filter', len(rfm_table)) as record:
+        segment_rfm = rfm_table[rfm_table['Customer Segment'].isin(segment_filter)] if segment_filter else rfm_table
+        record['rows_out'] = len(segment_rfm)
 
     # Visualizations (Sales Volume by Product, Segment Distribution, etc.)
     tabs = st.tabs(["Customer Segment Distribution", "Sales Volume by Product", "Sales Volume by Channel", "Sales vs Order", "Sales and Profit by Segment"])
 
     with tabs[0]:
         # Aggregate Customer IDs by Customer Segment
-        customer_count = df.groupby('Customer Segment')['_CustomerID'].nunique().reset_index()
+        customer_count = segment_rfm.groupby('Customer Segment', observed=True)['_CustomerID'].nunique().reset_index()
 
         # Create a pie chart for Customer Segment Distribution
         fig2 = px.pie(customer_count, names="Customer Segment", values="_CustomerID", 
                       title="Customer Segment Distribution", 
                       labels={'_CustomerID': 'Number of Customers'})
-        st.plotly_chart(fig2)
+        charts.plot(fig2, 'segment_distribution')
 
     with tabs[1]:
         # Aggregate Order Quantity by Product ID and Customer Segment
-        sales_by_product = df.groupby(['_ProductID', 'Customer Segment'])['Order Quantity'].sum().reset_index()
+        sales_by_product = charts.top_n(cube.sales_by_product(segment_filter), '_ProductID', 'Order Quantity')
 
         # Create a bar chart for Sales Volume by Product and Customer Segment
         fig1 = px.bar(sales_by_product, x="_ProductID", y="Order Quantity", 
@@ -230,11 +233,11 @@ def project():
         
         # Customize the layout for better clarity
         fig1.update_layout(xaxis_title="Product ID",yaxis_title="Sales Volume",xaxis_tickangle=-45)
-        st.plotly_chart(fig1)
+        charts.plot(fig1, 'sales_by_product')
 
     with tabs[2]:
         # Aggregate Order Quantity by Sales Channel and Customer Segment
-        sales_by_channel = df.groupby(['Sales Channel', 'Customer Segment'])['Order Quantity'].sum().reset_index()
+        sales_by_channel = cube.sales_by_channel(segment_filter)
         
         # Create a bar chart with better coloring
         fig3 = px.bar(sales_by_channel, x="Sales Channel", y="Order Quantity", 
@@ -245,14 +248,14 @@ def project():
         
         # Customize the layout for better clarity
         fig3.update_layout(xaxis_title="Sales Channel",yaxis_title="Sales Volume",barmode='stack', xaxis_tickangle=-45)
-        st.plotly_chart(fig3)
+        charts.plot(fig3, 'sales_by_channel')
 
     with tabs[3]:
-        # Aggregate data by Customer Segment and Customer ID
-        customer_order_sales = df.groupby(['_CustomerID', 'Customer Segment']).agg(
-            distinct_orders=('OrderNumber', 'nunique'),total_sales=('Sales per Order', 'sum')).reset_index()
+        # Distinct orders dan total sales per pelanggan sudah ada di RFM table (Frequency dan Monetary)
+        customer_order_sales = segment_rfm[['_CustomerID', 'Customer Segment', 'Frequency', 'Monetary']].rename(
+            columns={'Frequency': 'distinct_orders', 'Monetary': 'total_sales'})
         # Create scatter plot with distinct orders on x-axis and total sales on y-axis
-        fig4 = px.scatter(customer_order_sales, 
+        fig4 = charts.scatter(customer_order_sales, 
                         x='distinct_orders', 
                         y='total_sales', 
                         color='Customer Segment', 
@@ -260,11 +263,11 @@ def project():
                         labels={'distinct_orders': 'Distinct Order Count', 'total_sales': 'Total Sales'})
         # Customize the scatter plot for better visibility
         fig4.update_layout(xaxis_title="Distinct Order Count",yaxis_title="Total Sales",showlegend=True)
-        st.plotly_chart(fig4)
+        charts.plot(fig4, 'sales_vs_order')
 
     with tabs[4]:
         # Aggregate Sales per Order and Profit per Order by Customer Segment
-        df_segmented = df.groupby("Customer Segment")[["Sales per Order", "Profit per Order"]].sum().reset_index()
+        df_segmented = cube.sales_by_segment(segment_filter)
         # Create a bar chart for Sales and Profit by Customer Segment
         fig5 = px.bar(df_segmented, 
                     x="Customer Segment", 
@@ -281,7 +284,25 @@ def project():
             yaxis_title="Amount",
             showlegend=True
         )
-        st.plotly_chart(fig5)
+        charts.plot(fig5, 'sales_profit_by_segment')
+
+    # Migrasi segmen antar snapshot RFM bulanan (semua snapshot dihitung dalam satu pass, sekali per dataset)
+    migration_expander = st.expander("Segment Migration", key="segment_migration_expander", on_change="rerun")
+    with migration_expander:
+        if migration_expander.open:
+            with profiler.stage('segment_snapshots', len(df)) as record:
+                snapshots = load_snapshots(df, version[0])
+                record['rows_out'] = len(snapshots)
+            snapshot_dates = list(snapshots['Reference Date'].drop_duplicates().dt.date)
+            if len(snapshot_dates) > 1:
+                start_date, end_date = st.select_slider("Select Snapshot Range", options=snapshot_dates,
+                                                        value=(snapshot_dates[max(0, len(snapshot_dates) - 13)], snapshot_dates[-1]),
+                                                        key="migration_range")
+                if start_date != end_date:
+                    start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+                    st.markdown("<div style='text-align: justify;'>Jumlah pelanggan yang berpindah dari segmen pada snapshot awal (baris) ke segmen pada snapshot akhir (kolom). Pelanggan yang belum bertransaksi pada snapshot awal masuk ke baris New.</div>", unsafe_allow_html=True)
+                    st.dataframe(transition_matrix(snapshots, start_date, end_date))
+                    charts.plot(sankey_figure(snapshots, [start_date, end_date]), 'segment_migration')
 
     st.markdown("<h2 style='text-align: left;'>Recommendation</h2>", unsafe_allow_html=True)
     st.markdown("<h5 style='text-align: justify;'>Fokuskan di saluran In-Store dan Online:</div>", unsafe_allow_html=True)
@@ -295,7 +316,8 @@ def project():
     st.markdown("<h5 style='text-align: justify;'>Meningkatkan Segmen At Risk ke Potential atau Loyal dan Segmen Potential ke Loyal atau Champions:</div>", unsafe_allow_html=True)
     st.markdown("<ul><li><div style='text-align: justify;'>At Risk : Terapkan kampanye retensi dengan promosi produk yang mereka minati, seperti produk id 23 dan 41. Gunakan pendekatan personal seperti email automation dan push notifications dengan penawaran berbasis waktu yang relevan.</div>", unsafe_allow_html=True)
     st.markdown("<ul><li><div style='text-align: justify;'>Potential : Fokuskan promosi pada produk ID 15, 22, dan 38 untuk menarik minat segmen At Risk dan mengkonversinya menjadi Loyal atau Champions. Perbaiki pengalaman di saluran In-Store dan Online dengan penawaran menarik dan relevansi produk untuk meningkatkan penjualan dan frekuensi pembelian.</div>", unsafe_allow_html=True)
-   
+
+
 # Menjalankan aplikasi
 if __name__ == "__main__":
-    project()
\ No newline at end of file
+    project()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from rfm import SEGMENTS, score_table, to_cents
+
+# Migrasi segmen pelanggan antar snapshot RFM (misalnya bulanan). Semua snapshot dihitung dalam satu pass
+# atas order yang sudah diurutkan per tanggal: agregat kumulatif per pelanggan (last transaction, jumlah order
+# unik, total sen) di-update per rentang tanggal, lalu setiap snapshot hanya perlu scoring per pelanggan.
+
+NEW = 'New'  # pelanggan yang belum punya order pada snapshot awal
+
+
+def monthly_reference_dates(df):
+    # Awal setiap bulan setelah order pertama sampai bulan setelah order terakhir
+    start = df['OrderDate'].min().to_period('M') + 1
+    end = df['OrderDate'].max().to_period('M') + 1
+    return pd.period_range(start, end, freq='M').to_timestamp()
+
+
+def segment_snapshots(df, reference_dates, quantiles=5):
+    # Snapshot RFM per tanggal referensi; setiap snapshot hanya memakai order dengan OrderDate < tanggal tersebut
+    # (sama dengan rfm.compute_rfm pada df yang difilter). Hasil: tabel panjang satu baris per (tanggal, pelanggan)
+    if not 1 <= quantiles <= 9:
+        raise ValueError("quantiles must be between 1 and 9 so each score fits in one RFM Score digit")
+    reference_dates = pd.DatetimeIndex(sorted(reference_dates))
+    order = np.argsort(df['OrderDate'].to_numpy(), kind='stable')
+    dates = df['OrderDate'].to_numpy()[order]
+    codes, customers = pd.factorize(df['_CustomerID'].to_numpy()[order], sort=True)
+    first_order = ~pd.DataFrame({'customer': codes, 'order': df['OrderNumber'].to_numpy()[order]}).duplicated().to_numpy()
+    cents = to_cents(df['Sales per Order'])[order]
+
+    n = len(customers)
+    day_values = dates.view(np.int64)
+    last = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)  # NaT sebagai int64
+    frequency = np.zeros(n, dtype=np.int64)
+    monetary = np.zeros(n, dtype=np.int64)
+    bounds = np.searchsorted(dates, reference_dates.to_numpy().astype(dates.dtype), side='left')
+
+    snapshots = []
+    start = 0
+    for reference_date, stop in zip(reference_dates, bounds):
+        window = slice(start, stop)
+        np.maximum.at(last, codes[window], day_values[window])
+        frequency += np.bincount(codes[window][first_order[window]], minlength=n)
+        monetary += np.bincount(codes[window], weights=cents[window], minlength=n).astype(np.int64)
+        start = stop
+
+        active = frequency > 0
+        if not active.any():
+            continue
+        rfm_table = pd.DataFrame({'_CustomerID': customers[active], 'Last_Transaction': last[active].view(dates.dtype),
+                                  'Frequency': frequency[active], 'Monetary': monetary[active] / 100})
+        rfm_table = score_table(rfm_table, reference_date, quantiles)
+        rfm_table.insert(0, 'Reference Date', reference_date)
+        snapshots.append(rfm_table)
+    return pd.concat(snapshots, ignore_index=True)
+
+
+def _segments_at(snapshots, reference_date):
+    snapshot = snapshots[snapshots['Reference Date'] == reference_date]
+    return snapshot.set_index('_CustomerID')['Customer Segment']
+
+
+def transition_matrix(snapshots, start, end):
+    # Jumlah pelanggan dari segmen pada `start` (baris) ke segmen pada `end` (kolom)
+    before = _segments_at(snapshots, start)
+    after = _segments_at(snapshots, end)
+    before = before.reindex(after.index).astype(str).where(before.reindex(after.index).notna(), NEW)
+    matrix = pd.crosstab(pd.Categorical(before, categories=[NEW, *SEGMENTS]), pd.Categorical(after.astype(str), categories=SEGMENTS),
+                         rownames=['From'], colnames=['To'], dropna=False)
+    return matrix.loc[(matrix.sum(axis=1) > 0)]
+
+
+def sankey_figure(snapshots, reference_dates):
+    # Alur segmen antar beberapa snapshot berurutan
+    labels, sources, targets, values = [], [], [], []
+    node = {}
+
+    def node_id(label):
+        if label not in node:
+            node[label] = len(labels)
+            labels.append(label)
+        return node[label]
+
+    for start, end in zip(reference_dates[:-1], reference_dates[1:]):
+        matrix = transition_matrix(snapshots, start, end).stack()
+        for (before, after), count in matrix[matrix > 0].items():
+            sources.append(node_id(f"{before} ({start:%b %Y})"))
+            targets.append(node_id(f"{after} ({end:%b %Y})"))
+            values.append(int(count))
+    fig = go.Figure(go.Sankey(node={'label': labels, 'pad': 15}, link={'source': sources, 'target': targets, 'value': values}))
+    fig.update_layout(title="Customer Segment Migration")
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def load_snapshots(_df, fingerprint, quantiles=5):
+    # fingerprint dataset menjadi cache key; df tidak di-hash
+    return segment_snapshots(_df, monthly_reference_dates(_df), quantiles)
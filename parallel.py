@@ -0,0 +1,120 @@
+import functools
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from rfm import REFERENCE_DATE, add_recency, customer_aggregates, orders_before, score_table, to_cents
+from sketch import RFMSketches, compute_rfm_approx
+
+# Agregasi RFM paralel dalam dua tahap di process pool yang sama, tanpa kerja O(n) yang serial di proses induk:
+# 1. setiap worker membaca rentang baris [start, stop) dari df (diwarisi lewat fork, copy-on-write) lalu menulis
+#    nomor shard (hash _CustomerID), _CustomerID, OrderDate dan sen ke shared memory;
+# 2. setiap worker mengambil baris shard-nya dari shared memory, memfaktorkan OrderNumber baris tersebut
+#    dan melakukan groupby.
+# Satu pelanggan selalu berada di satu shard, jadi hasil per shard cukup digabung (concat).
+
+COLUMNS = 4  # shard, _CustomerID, OrderDate (us), Sales per Order (sen)
+
+_source = None  # df yang sedang diproses; dibaca worker hasil fork tanpa pickle
+
+
+def _prepare_rows(name, rows, workers, start, stop, frame=None):
+    frame = _source.iloc[start:stop] if frame is None else frame
+    shm = SharedMemory(name=name)
+    columns = np.ndarray((COLUMNS, rows), dtype=np.int64, buffer=shm.buf)[:, start:stop]
+    customer = frame['_CustomerID'].to_numpy()
+    columns[0] = pd.util.hash_array(customer) % np.uint64(workers)
+    columns[1] = customer
+    columns[2] = frame['OrderDate'].to_numpy('datetime64[us]').view(np.int64)
+    columns[3] = to_cents(frame['Sales per Order'])
+    del columns
+    shm.close()
+
+
+def _shard_rows(name, rows, shard):
+    shm = SharedMemory(name=name)
+    columns = np.ndarray((COLUMNS, rows), dtype=np.int64, buffer=shm.buf)
+    index = np.flatnonzero(columns[0] == shard)
+    selected = columns[1:, index]  # copy baris milik shard ini saja
+    del columns
+    shm.close()
+    return index, selected
+
+
+def _aggregate_shard(name, rows, shard, order_numbers=None, reference_date=None, relative_accuracy=None):
+    # Dengan relative_accuracy: worker juga menghitung Recency dan sketch R/F/M untuk pelanggan di shard-nya
+    index, selected = _shard_rows(name, rows, shard)
+    if order_numbers is None:
+        order_numbers = _source['OrderNumber'].iloc[index]
+    frame = pd.DataFrame({'_CustomerID': selected[0], 'OrderNumber': pd.factorize(order_numbers)[0],
+                          'OrderDate': selected[1].view('datetime64[us]'), 'Cents': selected[2]}, copy=False)
+    result = frame.groupby('_CustomerID', sort=False).agg(Last_Transaction=('OrderDate', 'max'), Frequency=('OrderNumber', 'nunique'),
+                                                          Cents=('Cents', 'sum'))
+    if relative_accuracy is None:
+        return result, None
+    add_recency(result, reference_date)
+    values = {'Recency': result['Recency'], 'Frequency': result['Frequency'], 'Monetary': result['Cents'] / 100}
+    return result, RFMSketches(relative_accuracy).update(values)
+
+
+def _run_shards(df, workers, reference_date=None, relative_accuracy=None):
+    global _source
+
+    rows = len(df)
+    bounds = np.linspace(0, rows, workers + 1).astype(np.int64)
+    fork = 'fork' in mp.get_all_start_methods()
+    shm = SharedMemory(create=True, size=max(1, COLUMNS * rows * 8))
+    names, counts = [shm.name] * workers, [rows] * workers
+    try:
+        _source = df
+        with ProcessPoolExecutor(workers, mp_context=mp.get_context('fork') if fork else None) as pool:
+            if fork:
+                list(pool.map(_prepare_rows, names, counts, [workers] * workers, bounds[:-1], bounds[1:]))
+                parts = list(pool.map(_aggregate_shard, names, counts, range(workers), [None] * workers,
+                                      [reference_date] * workers, [relative_accuracy] * workers))
+            else:
+                # Tanpa fork (Windows) rentang baris dan OrderNumber per shard dikirim ke worker lewat pickle
+                frames = [df.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+                list(pool.map(_prepare_rows, names, counts, [workers] * workers, bounds[:-1], bounds[1:], frames))
+                orders = [df['OrderNumber'].iloc[_shard_rows(shm.name, rows, shard)[0]] for shard in range(workers)]
+                parts = list(pool.map(_aggregate_shard, names, counts, range(workers), orders,
+                                      [reference_date] * workers, [relative_accuracy] * workers))
+    finally:
+        _source = None
+        shm.close()
+        shm.unlink()
+
+    tables, sketches = zip(*parts)
+    rfm_table = pd.concat(tables).sort_index()
+    rfm_table.index = rfm_table.index.astype(df['_CustomerID'].dtype)
+    rfm_table['Last_Transaction'] = rfm_table['Last_Transaction'].astype(df['OrderDate'].dtype)
+    rfm_table['Monetary'] = rfm_table.pop('Cents') / 100
+    if 'Recency' in rfm_table.columns:
+        rfm_table['Recency'] = rfm_table.pop('Recency')
+    sketch = None if relative_accuracy is None else functools.reduce(RFMSketches.merge, sketches)
+    return rfm_table.reset_index(), sketch
+
+
+def parallel_customer_aggregates(df, workers=None):
+    # Hasil sama dengan rfm.customer_aggregates(df)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return customer_aggregates(df)
+    return _run_shards(df, workers)[0]
+
+
+def compute_rfm_parallel(df, reference_date=REFERENCE_DATE, quantiles=5, workers=None, relative_accuracy=None):
+    # relative_accuracy: threshold persentil dari merge sketch per shard (aproksimasi) alih-alih persentil exact
+    # atas seluruh tabel pelanggan di proses induk
+    workers = workers or os.cpu_count() or 1
+    df = orders_before(df, reference_date)
+    if relative_accuracy is None:
+        return score_table(parallel_customer_aggregates(df, workers), reference_date, quantiles)
+    if workers == 1:
+        return compute_rfm_approx(df, reference_date, quantiles, relative_accuracy, compare=False)[0]
+    rfm_table, sketch = _run_shards(df, workers, reference_date, relative_accuracy)
+    return score_table(rfm_table, None, quantiles, sketch.thresholds(quantiles))
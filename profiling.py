@@ -0,0 +1,145 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from loader import SIDECAR_DIR
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Instrumentasi per tahap untuk main.project(): wall time, delta peak tracemalloc, peak RSS, jumlah baris
+# masuk/keluar dan ukuran payload Plotly. Hanya aktif bila server dijalankan dengan env RFM_PROFILE=1; hasilnya
+# tampil di panel debug sidebar dan ditambahkan sebagai JSON lines ke PROFILE_LOG (dirotasi ke PROFILE_LOG.1).
+# tracemalloc dan peak-nya berlaku untuk seluruh proses, jadi run yang diprofil dijalankan satu per satu dan
+# tracemalloc dihentikan lagi di akhir run yang menyalakannya.
+
+PROFILE_LOG = os.environ.get('RFM_PROFILE_LOG', os.path.join(SIDECAR_DIR, 'profile.jsonl'))
+PROFILE_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+_local = threading.local()
+_run_lock = threading.Lock()
+
+
+def _peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Profiler:
+
+    def __init__(self, enabled=False, session=None):
+        self.enabled = enabled
+        self.session = session
+        self.run = uuid.uuid4().hex
+        self.records = []
+        self.depth = 0
+        self.started_tracing = enabled and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def close(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        # Yield dict record; pemanggil boleh mengisi 'rows_out' atau 'payload_bytes'.
+        # Peak tracemalloc hanya di-reset di tahap terluar, jadi untuk tahap bersarang peak-nya mencakup tahap induk.
+        record = {'stage': name, 'rows_in': rows_in, 'rows_out': None, 'payload_bytes': None}
+        if not self.enabled:
+            yield record
+            return
+        if not self.depth:
+            tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        self.depth += 1
+        try:
+            yield record
+        finally:
+            self.depth -= 1
+            record['wall_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            record['tracemalloc_peak_delta_bytes'] = tracemalloc.get_traced_memory()[1] - before
+            record['peak_rss_bytes'] = _peak_rss()
+            self.records.append(record)
+
+    def export(self, path=PROFILE_LOG, max_bytes=PROFILE_LOG_MAX_BYTES):
+        if not self.enabled or not self.records:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+            os.replace(path, f'{path}.1')
+        timestamp = pd.Timestamp.now(tz='UTC').isoformat()
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in self.records:
+                f.write(json.dumps({'timestamp': timestamp, 'session': self.session, 'run': self.run, **record}) + '\n')
+
+    def render(self):
+        if not self.enabled:
+            return
+        with st.sidebar.expander("Debug: profiling"):
+            st.dataframe(pd.DataFrame(self.records).set_index('stage'))
+            st.caption(f"Total {sum(r['wall_ms'] for r in self.records):,.1f} ms, log: {PROFILE_LOG}")
+
+
+@contextmanager
+def run():
+    # Profiler untuk satu rerun (per thread script Streamlit). Panel debug dirender bila run selesai normal;
+    # log ditulis dan tracemalloc dihentikan juga bila rerun terputus (misalnya RerunException)
+    enabled = os.environ.get('RFM_PROFILE') == '1'
+    session = st.session_state.setdefault('profiling_session', uuid.uuid4().hex)
+    if enabled:
+        _run_lock.acquire()
+    profiler = _local.profiler = Profiler(enabled, session)
+    try:
+        yield profiler
+        profiler.render()
+    finally:
+        _local.profiler = None
+        if enabled:
+            try:
+                profiler.close()
+                profiler.export()
+            finally:
+                _run_lock.release()
+
+
+def current():
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is None:
+        profiler = _local.profiler = Profiler()
+    return profiler
+
+
+def stage(name, rows_in=None):
+    return current().stage(name, rows_in)
+
+
+def profiled(name):
+    # Decorator: mencatat pemanggilan fungsi sebagai satu tahap; rows_in dari argumen DataFrame pertama
+    # dan rows_out dari panjang hasilnya
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rows_in = next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), None)
+            with stage(name, rows_in) as record:
+                result = fn(*args, **kwargs)
+                if hasattr(result, '__len__'):
+                    record['rows_out'] = len(result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+REFERENCE_DATE = pd.Timestamp('2021-01-01')
+SEGMENTS = ['Champions', 'Loyal', 'Potential', 'At Risk', 'Uncategorized']
+
+
+FLOAT32_MONEY_LIMIT = 2 ** 16  # di bawah batas ini float32 masih menyimpan nilai sen secara exact
+
+
+def add_order_metrics(df):
+    # Membuat kolom 'Sales per Order' dan 'Profit per Order'.
+    # Harga dan biaya dikembalikan ke nilai sen exact dulu, jadi hasilnya sama walaupun kolomnya disimpan sebagai float32
+    price = to_cents(df['Unit Price']) / 100
+    cost = to_cents(df['Unit Cost']) / 100
+    df['Sales per Order'] = round(df['Order Quantity'] * price * (1 - df['Discount Applied']), 2)
+    df['Profit per Order'] = round(df['Sales per Order'] - (df['Order Quantity'] * cost), 2)
+    return downcast_money(df, ['Sales per Order', 'Profit per Order'])
+
+
+def to_cents(values):
+    # Nilai uang (sudah dibulatkan 2 desimal) sebagai integer sen, supaya penjumlahan per chunk/batch hasilnya identik
+    return np.round(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def order_keys(order_numbers):
+    # OrderNumber sebagai hash 64-bit: kunci dedup yang ringkas, berapa pun panjang id order aslinya
+    return pd.util.hash_pandas_object(pd.Series(order_numbers, copy=False), index=False).to_numpy()
+
+
+def downcast_money(df, columns):
+    # Kolom uang disimpan sebagai float32 bila nilainya cukup kecil untuk tetap exact sampai sen
+    for col in columns:
+        if col in df.columns and len(df) and df[col].abs().max() < FLOAT32_MONEY_LIMIT:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+def customer_aggregates(df):
+    # Last transaction, jumlah order unik dan total penjualan per pelanggan
+    grouped = df.groupby('_CustomerID', observed=True)
+    rfm_table = grouped.agg(Last_Transaction=('OrderDate', 'max'), Frequency=('OrderNumber', 'nunique'))
+    rfm_table['Monetary'] = pd.Series(to_cents(df['Sales per Order']), index=df.index).groupby(df['_CustomerID']).sum() / 100
+    return rfm_table.reset_index()
+
+
+def percentile_thresholds(values, quantiles=5):
+    # Titik potong persentil, misalnya 20/40/60/80 untuk 5 kuantil
+    return np.percentile(values, np.linspace(0, 100, quantiles + 1)[1:-1])
+
+
+def bin_index(values, thresholds):
+    # Setara dengan pd.cut(..., bins=[0, *thresholds, inf], right=False): indeks bin 0..len(thresholds)
+    return np.searchsorted(np.asarray(thresholds), np.asarray(values), side='right')
+
+
+def segment_table(quantiles=5):
+    # Tabel lookup segmen untuk setiap kombinasi skor R, F, M (125 entri untuk 5 kuantil).
+    # Batas segmen sama dengan perbandingan string RFM Score sebelumnya, misalnya "511" - "555" untuk Champions.
+    scores = np.arange(1, quantiles + 1)
+    r, f, m = np.meshgrid(scores, scores, scores, indexing='ij')
+    code = (100 * r + 10 * f + m).ravel()
+    conditions = [(code >= 511) & (code <= 555), (code >= 451) & (code <= 510),
+                  (code >= 351) & (code <= 450), (code >= 151) & (code <= 350)]
+    return np.select(conditions, np.arange(4), default=4).astype(np.int8)
+
+
+def add_recency(rfm_table, reference_date=REFERENCE_DATE):
+    rfm_table['Recency'] = (pd.Timestamp(reference_date) - rfm_table['Last_Transaction']).dt.days
+    return rfm_table
+
+
+def score_table(rfm_table, reference_date=REFERENCE_DATE, quantiles=5, thresholds=None):
+    # Menambahkan Recency, skor R/F/M (integer), RFM Score dan Customer Segment ke tabel agregat per pelanggan.
+    # reference_date=None: kolom Recency sudah dihitung pemanggil (misalnya bersama sketch) dan dipakai apa adanya.
+    # thresholds opsional: dict {'Recency': ..., 'Frequency': ..., 'Monetary': ...} hasil perhitungan di luar fungsi ini
+    if reference_date is not None:
+        add_recency(rfm_table, reference_date)
+    if thresholds is None:
+        thresholds = {col: percentile_thresholds(rfm_table[col], quantiles) for col in ['Recency', 'Frequency', 'Monetary']}
+
+    r_score = quantiles - bin_index(rfm_table['Recency'], thresholds['Recency'])
+    f_score = bin_index(rfm_table['Frequency'], thresholds['Frequency']) + 1
+    m_score = bin_index(rfm_table['Monetary'], thresholds['Monetary']) + 1
+    rfm_table['R Score'] = r_score.astype(np.int8)
+    rfm_table['F Score'] = f_score.astype(np.int8)
+    rfm_table['M Score'] = m_score.astype(np.int8)
+    rfm_table['RFM Score'] = (100 * r_score + 10 * f_score + m_score).astype(np.int16)
+
+    lookup = segment_table(quantiles)
+    codes = lookup[((r_score - 1) * quantiles + (f_score - 1)) * quantiles + (m_score - 1)]
+    rfm_table['Customer Segment'] = pd.Categorical.from_codes(codes, categories=SEGMENTS)
+    return rfm_table
+
+
+def customer_segments(customer_ids, rfm_table):
+    # Customer Segment untuk setiap order lewat lookup array codes[customer_id], tanpa merge ke tabel order
+    ids = rfm_table['_CustomerID'].to_numpy()
+    codes = rfm_table['Customer Segment'].cat.codes.to_numpy()
+    customer_ids = np.asarray(customer_ids)
+    if len(ids) and ids.min() >= 0 and ids.max() < 4 * len(ids) + 1024:
+        lookup = np.full(ids.max() + 1, -1, dtype=np.int8)
+        lookup[ids] = codes
+        known = (customer_ids >= 0) & (customer_ids <= ids.max())
+        order_codes = np.where(known, lookup[np.clip(customer_ids, 0, ids.max())], -1)
+    else:
+        # ID yang jarang/besar: pakai hash index sebagai pengganti array
+        position = pd.Index(ids).get_indexer(customer_ids)
+        order_codes = np.where(position >= 0, codes[position], -1)
+    return pd.Categorical.from_codes(order_codes, categories=SEGMENTS)
+
+
+def orders_before(df, reference_date=REFERENCE_DATE):
+    # Hanya order dengan OrderDate < tanggal referensi yang dihitung, jadi Recency tidak pernah negatif.
+    # df dikembalikan apa adanya (tanpa copy) bila semua order sudah sebelum tanggal referensi
+    before = df['OrderDate'].to_numpy() < np.datetime64(pd.Timestamp(reference_date))
+    return df if before.all() else df[before]
+
+
+def compute_rfm(df, reference_date=REFERENCE_DATE, quantiles=5):
+    # df harus memiliki kolom _CustomerID, OrderDate, OrderNumber dan 'Sales per Order'
+    if not 1 <= quantiles <= 9:
+        raise ValueError("quantiles must be between 1 and 9 so each score fits in one RFM Score digit")
+    return score_table(customer_aggregates(orders_before(df, reference_date)), reference_date, quantiles)
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+from loader import SIDECAR_DIR
+from rfm import REFERENCE_DATE, compute_rfm
+
+# Cache hasil RFM di disk, content-addressed dengan key fingerprint dataset + tanggal referensi + jumlah kuantil.
+# Direktori cache dipakai bersama oleh semua sesi Streamlit dan proses worker; file ditulis atomik,
+# dan hanya satu proses yang menghitung key yang sama (proses lain menunggu hasilnya).
+# Bila total ukuran melebihi batas, file yang paling lama tidak dipakai dihapus (LRU berdasarkan mtime).
+
+CACHE_DIR = os.path.join(SIDECAR_DIR, 'rfm')
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+LOCK_TIMEOUT = 600  # detik; lock yang lebih tua dari ini dianggap sisa proses yang mati
+CACHE_VERSION = 2  # naikkan bila definisi RFM berubah supaya hasil lama tidak terpakai
+MEMORY_ENTRIES = 8  # jumlah versi (dataset + tanggal referensi) yang disimpan di memori server per cache Streamlit
+
+
+def cache_key(fingerprint, reference_date=REFERENCE_DATE, quantiles=5):
+    raw = f'{CACHE_VERSION}:{fingerprint}:{pd.Timestamp(reference_date).isoformat()}:{quantiles}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _acquire_lock(lock_path, result_path):
+    # True bila lock didapat; False bila proses lain sudah selesai menulis hasilnya
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            if os.path.exists(result_path):
+                return False
+            try:
+                if time.time() - os.path.getmtime(lock_path) > LOCK_TIMEOUT:
+                    os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+            time.sleep(0.1)
+
+
+def _read(path):
+    try:
+        rfm_table = pd.read_parquet(path)
+    except (OSError, ValueError):
+        return None
+    os.utime(path)  # tandai sebagai baru dipakai untuk LRU
+    return rfm_table
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.parquet'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_rfm(df, fingerprint, reference_date=REFERENCE_DATE, quantiles=5, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    path = os.path.join(cache_dir, f'{cache_key(fingerprint, reference_date, quantiles)}.parquet')
+    if os.path.exists(path):
+        rfm_table = _read(path)
+        if rfm_table is not None:
+            return rfm_table
+
+    os.makedirs(cache_dir, exist_ok=True)
+    lock_path = f'{path}.lock'
+    if not _acquire_lock(lock_path, path):
+        rfm_table = _read(path)
+        if rfm_table is not None:
+            return rfm_table
+        return compute_rfm(df, reference_date, quantiles)
+    try:
+        rfm_table = compute_rfm(df, reference_date, quantiles)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        rfm_table.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    finally:
+        os.remove(lock_path)
+    evict(cache_dir, max_bytes)
+    return rfm_table
+
+
+@st.cache_resource(show_spinner=False, max_entries=MEMORY_ENTRIES)
+def load_rfm(_df, fingerprint, reference_date=REFERENCE_DATE, quantiles=5):
+    # Lapisan cache di memori per proses di atas cache disk; df tidak di-hash, fingerprint yang menjadi key.
+    # Tabel yang sama dibagikan ke semua sesi dan rerun tanpa copy, jadi pemanggil tidak boleh memodifikasinya
+    return cached_rfm(_df, fingerprint, reference_date, quantiles)
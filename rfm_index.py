@@ -0,0 +1,53 @@
+import numpy as np
+import streamlit as st
+
+from rfm_cache import MEMORY_ENTRIES
+
+# Index terurut per dimensi untuk RFM table, dipakai oleh slider Recency/Frequency/Monetary.
+# Query rentang 3 dimensi: dimensi paling selektif diambil lewat searchsorted, dua dimensi lain hanya dicek
+# pada kandidat tersebut, jadi tidak ada scan penuh. Hasilnya ditampilkan per halaman.
+
+RFM_DIMENSIONS = ['Recency', 'Frequency', 'Monetary']
+PAGE_SIZE = 100
+
+
+class RFMIndex:
+
+    def __init__(self, rfm_table, columns=RFM_DIMENSIONS):
+        self.table = rfm_table.reset_index(drop=True)
+        self.values = {col: self.table[col].to_numpy() for col in columns}
+        self.order = {col: np.argsort(values, kind='stable') for col, values in self.values.items()}
+        self.sorted = {col: self.values[col][order] for col, order in self.order.items()}
+
+    def __len__(self):
+        return len(self.table)
+
+    def bounds(self, col):
+        return self.sorted[col][0], self.sorted[col][-1]
+
+    def query(self, ranges):
+        # ranges: {'Recency': (lo, hi), ...}, batas inklusif. Mengembalikan posisi baris (urut) yang cocok
+        slices = {}
+        for col, (lo, hi) in ranges.items():
+            values = self.sorted[col]
+            slices[col] = (np.searchsorted(values, lo, side='left'), np.searchsorted(values, hi, side='right'))
+        active = {col: s for col, s in slices.items() if s != (0, len(self))}
+        if not active:
+            return np.arange(len(self))
+
+        best = min(active, key=lambda col: active[col][1] - active[col][0])
+        start, stop = active.pop(best)
+        rows = self.order[best][start:stop]
+        for col in active:
+            lo, hi = ranges[col]
+            values = self.values[col][rows]
+            rows = rows[(values >= lo) & (values <= hi)]
+        return np.sort(rows)
+
+    def page(self, rows, page=0, page_size=PAGE_SIZE):
+        return self.table.iloc[rows[page * page_size:(page + 1) * page_size]]
+
+
+@st.cache_resource(show_spinner=False, max_entries=MEMORY_ENTRIES)
+def load_rfm_index(_rfm_table, version):
+    return RFMIndex(_rfm_table)
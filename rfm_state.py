@@ -0,0 +1,169 @@
+import json
+import os
+import sys
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from rfm import REFERENCE_DATE, add_order_metrics, order_keys, score_table, to_cents
+
+MANIFEST_FILE = 'manifest.json'
+ORDERS_DIR = 'orders'
+
+
+class RFMState:
+    # State RFM per pelanggan (Last_Transaction, Frequency, Monetary dalam sen) yang bisa di-update per batch order.
+    # Hash OrderNumber yang sudah diproses disimpan per bulan OrderDate; update hanya memuat bulan yang ada di batch,
+    # jadi replay batch yang sama tidak dihitung dua kali tanpa membaca seluruh riwayat order.
+    # save() menulis file baru dengan nama versi lalu mengganti manifest.json secara atomik; manifest lama tetap
+    # menunjuk ke file yang konsisten bila proses berhenti di tengah jalan.
+
+    def __init__(self, path=None):
+        self.path = path
+        self._rows = {}  # _CustomerID -> posisi di array
+        self._ids = np.empty(0, dtype=np.int64)
+        self._last = np.empty(0, dtype='datetime64[us]')
+        self._frequency = np.empty(0, dtype=np.int64)
+        self._monetary_cents = np.empty(0, dtype=np.int64)
+        self._seen = {}  # bulan -> hash order terurut yang sudah dimuat
+        self._dirty = set()
+        self._files = {'customers': None, 'orders': {}}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _seen_orders(self, month):
+        if month not in self._seen:
+            name = self._files['orders'].get(month)
+            keys = pd.read_parquet(os.path.join(self.path, ORDERS_DIR, name))['key'].to_numpy() if name else None
+            self._seen[month] = np.empty(0, dtype=np.uint64) if keys is None else keys
+        return self._seen[month]
+
+    def _reserve(self, size):
+        # Kapasitas array tumbuh dua kali lipat, jadi menambah pelanggan baru rata-rata O(batch)
+        if size <= len(self._ids):
+            return
+        capacity = max(size, 2 * len(self._ids), 1024)
+        for name in ['_ids', '_last', '_frequency', '_monetary_cents']:
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def update(self, batch):
+        # Menggabungkan batch order baru ke state; hanya batch dan pelanggan di dalamnya yang disentuh
+        keys = order_keys(batch['OrderNumber'])
+        months = batch['OrderDate'].dt.to_period('M').astype(str).to_numpy()
+        keep = np.ones(len(batch), dtype=bool)
+        for month in np.unique(months):
+            in_month = months == month
+            keep[in_month] = ~np.isin(keys[in_month], self._seen_orders(month))
+        batch, keys, months = batch[keep], keys[keep], months[keep]
+        if batch.empty:
+            return 0
+        if 'Sales per Order' not in batch.columns:
+            batch = add_order_metrics(batch.copy())
+
+        customer = batch['_CustomerID']
+        grouped = batch.groupby('_CustomerID', observed=True)
+        last = grouped['OrderDate'].max()
+        frequency = grouped['OrderNumber'].nunique()
+        cents = pd.Series(to_cents(batch['Sales per Order']), index=batch.index).groupby(customer).sum()
+
+        ids = last.index.to_numpy()
+        rows = np.fromiter((self._rows.get(c, -1) for c in ids.tolist()), dtype=np.int64, count=len(ids))
+        new = rows < 0
+        if new.any():
+            start = len(self._rows)
+            rows[new] = np.arange(start, start + new.sum())
+            self._reserve(start + new.sum())
+            self._rows.update(zip(ids[new].tolist(), rows[new].tolist()))
+            self._ids[rows[new]] = ids[new]
+            self._last[rows[new]] = np.datetime64('NaT')
+        self._last[rows] = np.fmax(self._last[rows], last.to_numpy().astype(self._last.dtype))
+        self._frequency[rows] += frequency.to_numpy()
+        self._monetary_cents[rows] += cents.to_numpy()
+
+        for month in np.unique(months):
+            self._seen[month] = np.union1d(self._seen_orders(month), keys[months == month])
+            self._dirty.add(month)
+        return len(batch)
+
+    @property
+    def customers(self):
+        n = len(self._rows)
+        return pd.DataFrame({'Last_Transaction': self._last[:n],
+                             'Frequency': self._frequency[:n],
+                             'Monetary': self._monetary_cents[:n] / 100},
+                            index=pd.Index(self._ids[:n], name='_CustomerID'))
+
+    def rfm_table(self, reference_date=REFERENCE_DATE, quantiles=5):
+        # Persentil dihitung ulang dari state per pelanggan, bukan dari order mentah
+        return score_table(self.customers.sort_index().reset_index(), reference_date, quantiles)
+
+    def save(self, path=None):
+        path = path or self.path
+        if path is None:
+            raise ValueError("no state directory: pass a path to save() or create the state with RFMState(path)")
+        if path != self.path:
+            # Pindah direktori: semua partisi order harus ikut ditulis
+            for month in self._files['orders']:
+                self._seen_orders(month)
+            self._dirty.update(self._files['orders'])
+        os.makedirs(os.path.join(path, ORDERS_DIR), exist_ok=True)
+
+        version = uuid.uuid4().hex[:12]
+        n = len(self._rows)
+        customers = pd.DataFrame({'_CustomerID': self._ids[:n], 'Last_Transaction': self._last[:n],
+                                  'Frequency': self._frequency[:n], 'Monetary_Cents': self._monetary_cents[:n]})
+        files = {'customers': f'customers.{version}.parquet', 'orders': dict(self._files['orders'])}
+        customers.to_parquet(os.path.join(path, files['customers']), index=False)
+        for month in sorted(self._dirty):
+            files['orders'][month] = f'{month}.{version}.parquet'
+            pd.DataFrame({'key': self._seen[month]}).to_parquet(os.path.join(path, ORDERS_DIR, files['orders'][month]), index=False)
+
+        # Manifest ditulis terakhir; os.replace membuat customers dan semua partisi order berganti bersamaan
+        tmp = os.path.join(path, f'{MANIFEST_FILE}.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(files, f)
+        os.replace(tmp, os.path.join(path, MANIFEST_FILE))
+        self.path, self._files, self._dirty = path, files, set()
+
+        # File versi lama (atau sisa save yang gagal) tidak lagi dirujuk manifest
+        referenced = {files['customers'], *files['orders'].values()}
+        for directory in [path, os.path.join(path, ORDERS_DIR)]:
+            for name in os.listdir(directory):
+                if name.endswith('.parquet') and name not in referenced:
+                    os.remove(os.path.join(directory, name))
+
+    @classmethod
+    def load(cls, path):
+        state = cls(path)
+        manifest = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest):
+            return state
+        with open(manifest, encoding='utf-8') as f:
+            state._files = json.load(f)
+        customers = pd.read_parquet(os.path.join(path, state._files['customers']))
+        n = len(customers)
+        state._reserve(n)
+        state._ids[:n] = customers['_CustomerID'].to_numpy()
+        state._last[:n] = customers['Last_Transaction'].to_numpy().astype(state._last.dtype)
+        state._frequency[:n] = customers['Frequency'].to_numpy()
+        state._monetary_cents[:n] = customers['Monetary_Cents'].to_numpy()
+        state._rows = dict(zip(state._ids[:n].tolist(), range(n)))
+        return state
+
+
+# Contoh: python rfm_state.py .rfm_state orders_2021-01-02.csv
+if __name__ == "__main__":
+    from loader import read_sales
+
+    if len(sys.argv) < 3:
+        sys.exit("usage: python rfm_state.py STATE_DIR BATCH.csv [BATCH.csv ...]")
+    state = RFMState.load(sys.argv[1])
+    for batch_path in sys.argv[2:]:
+        added = state.update(read_sales(batch_path))
+        print(f"{batch_path}: {added:,} new order rows, {len(state):,} customers")
+    state.save(sys.argv[1])
@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from loader import coerce_dates, parse_sales_csv
+from rfm import REFERENCE_DATE, add_order_metrics, compute_rfm
+
+# Scoring RFM tanpa Streamlit untuk job batch, pipeline-nya sama dengan main.project().
+# Contoh: python score.py data/region_*.csv --output-dir scores --workers 4 --reference-date 2021-01-01
+
+OUTPUT_COLUMNS = ['_CustomerID', 'R Score', 'F Score', 'M Score', 'RFM Score', 'Customer Segment']
+
+
+def read_orders(path):
+    if path.endswith('.parquet'):
+        return coerce_dates(pd.read_parquet(path))
+    return parse_sales_csv(path)
+
+
+def output_path(path, output_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, f'{stem}.rfm.parquet')
+
+
+def score_file(path, output_dir, reference_date=REFERENCE_DATE, quantiles=5):
+    start = time.perf_counter()
+    df = add_order_metrics(read_orders(path))
+    rfm_table = compute_rfm(df, reference_date, quantiles)
+    # Ditulis ke file sementara lalu os.replace, jadi file output tidak pernah setengah jadi
+    output = output_path(path, output_dir)
+    tmp = f'{output}.{os.getpid()}.tmp'
+    try:
+        rfm_table[OUTPUT_COLUMNS].to_parquet(tmp, index=False)
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path, len(df), len(rfm_table), time.perf_counter() - start
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def duplicate_outputs(inputs, output_dir):
+    # Input berbeda yang akan menulis ke file output yang sama (misalnya a/sales.csv dan b/sales.csv)
+    targets = {}
+    for path in inputs:
+        targets.setdefault(output_path(path, output_dir), []).append(path)
+    return {output: paths for output, paths in targets.items() if len(paths) > 1}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hitung skor RFM dan segmen pelanggan untuk satu atau banyak file penjualan")
+    parser.add_argument('inputs', nargs='+', help="file CSV atau Parquet dengan skema US_Regional_Sales_Data")
+    parser.add_argument('--output-dir', default='rfm_scores')
+    parser.add_argument('--workers', type=positive_int, default=None, help="jumlah proses (default: jumlah CPU)")
+    parser.add_argument('--reference-date', type=pd.Timestamp, default=REFERENCE_DATE)
+    parser.add_argument('--quantiles', type=int, default=5)
+    args = parser.parse_args(argv)
+    unique = {}
+    for path in args.inputs:
+        unique.setdefault(os.path.realpath(path), path)  # file yang sama disebut dua kali cukup diproses sekali
+    args.inputs = list(unique.values())
+    duplicates = duplicate_outputs(args.inputs, args.output_dir)
+    if duplicates:
+        parser.error("several inputs would write the same output: " +
+                     "; ".join(f"{output} <- {', '.join(paths)}" for output, paths in duplicates.items()))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    workers = min(args.workers or os.cpu_count() or 1, len(args.inputs))
+    start = time.perf_counter()
+    total_rows = total_customers = 0
+    failed = []
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {path: pool.submit(score_file, path, args.output_dir, args.reference_date, args.quantiles) for path in args.inputs}
+        for path, future in futures.items():
+            # Satu file yang gagal tidak menghentikan file lain; dilaporkan dan exit code menjadi 1
+            try:
+                _, rows, customers, seconds = future.result()
+            except Exception as exc:
+                failed.append(path)
+                print(f"{path}: failed: {type(exc).__name__}: {exc}", file=sys.stderr)
+                continue
+            total_rows += rows
+            total_customers += customers
+            print(f"{path}: {rows:,} rows, {customers:,} customers, {seconds:.2f} s ({rows / seconds:,.0f} rows/s)")
+    elapsed = time.perf_counter() - start
+    print(f"total: {len(args.inputs) - len(failed)} files, {total_rows:,} rows, {total_customers:,} customers, "
+          f"{elapsed:.2f} s ({total_rows / elapsed:,.0f} rows/s, {workers} workers)")
+    if failed:
+        print(f"{len(failed)} of {len(args.inputs)} files failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from rfm import REFERENCE_DATE, add_recency, bin_index, customer_aggregates, orders_before, percentile_thresholds, score_table
+
+# Threshold persentil RFM secara aproksimasi dengan quantile sketch (DDSketch: bucket logaritmik dengan
+# error relatif yang bisa diatur). Sketch dibangun dalam satu pass, memorinya hanya sebanyak bucket yang
+# terisi, dan bisa di-merge antar worker dengan menjumlahkan hitungan per bucket: parallel.compute_rfm_parallel
+# membangun sketch per shard pelanggan di worker sehingga proses induk tidak perlu menghitung persentil exact.
+
+RFM_COLUMNS = ['Recency', 'Frequency', 'Monetary']
+
+
+class QuantileSketch:
+
+    def __init__(self, relative_accuracy=0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.positive = pd.Series(dtype=np.int64)
+        self.negative = pd.Series(dtype=np.int64)
+        self.zero = 0
+        self.count = 0
+        self.integral = True
+
+    def _buckets(self, magnitudes):
+        keys = np.ceil(np.log(magnitudes) / np.log(self.gamma)).astype(np.int64)
+        return pd.Series(keys).value_counts()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.positive = self.positive.add(self._buckets(values[values > 0]), fill_value=0).astype(np.int64)
+        self.negative = self.negative.add(self._buckets(-values[values < 0]), fill_value=0).astype(np.int64)
+        self.zero += int((values == 0).sum())
+        self.count += len(values)
+        self.integral = self.integral and bool(np.all(values == np.round(values)))
+        return self
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different relative_accuracy")
+        self.positive = self.positive.add(other.positive, fill_value=0).astype(np.int64)
+        self.negative = self.negative.add(other.negative, fill_value=0).astype(np.int64)
+        self.zero += other.zero
+        self.count += other.count
+        self.integral = self.integral and other.integral
+        return self
+
+    def quantiles(self, qs):
+        # qs dalam rentang 0..1; nilai bucket diwakili titik tengahnya sehingga error relatif <= relative_accuracy.
+        # Untuk data bilangan bulat (Recency, Frequency) hasilnya dibulatkan, supaya pelanggan dengan nilai yang
+        # sama persis dengan threshold tidak pindah bin hanya karena error aproksimasi
+        if not self.count:
+            raise ValueError("cannot compute quantiles of an empty sketch")
+        positive = self.positive.sort_index()
+        negative = self.negative.sort_index(ascending=False)
+        values = np.concatenate([-self._bucket_values(negative.index), [0.0], self._bucket_values(positive.index)])
+        counts = np.concatenate([negative.to_numpy(), [self.zero], positive.to_numpy()])
+        ranks = np.asarray(qs, dtype=np.float64) * (self.count - 1)
+        result = values[np.searchsorted(np.cumsum(counts), ranks, side='right')]
+        return np.round(result) if self.integral else result
+
+    def _bucket_values(self, keys):
+        return 2 * self.gamma ** np.asarray(keys, dtype=np.float64) / (self.gamma + 1)
+
+
+class RFMSketches:
+    # Satu sketch untuk setiap kolom Recency, Frequency dan Monetary pada tabel per pelanggan
+
+    def __init__(self, relative_accuracy=0.01):
+        self.sketches = {col: QuantileSketch(relative_accuracy) for col in RFM_COLUMNS}
+
+    def update(self, rfm_table):
+        for col, sketch in self.sketches.items():
+            sketch.update(rfm_table[col])
+        return self
+
+    def merge(self, other):
+        for col, sketch in self.sketches.items():
+            sketch.merge(other.sketches[col])
+        return self
+
+    def thresholds(self, quantiles=5):
+        qs = np.linspace(0, 1, quantiles + 1)[1:-1]
+        return {col: sketch.quantiles(qs) for col, sketch in self.sketches.items()}
+
+
+def score_changes(rfm_table, thresholds, quantiles=5):
+    # Jumlah pelanggan yang skor R, F atau M-nya berbeda dibanding threshold persentil exact
+    changed = np.zeros(len(rfm_table), dtype=bool)
+    for col in RFM_COLUMNS:
+        exact = percentile_thresholds(rfm_table[col], quantiles)
+        changed |= bin_index(rfm_table[col], exact) != bin_index(rfm_table[col], thresholds[col])
+    return int(changed.sum())
+
+
+def compute_rfm_approx(df, reference_date=REFERENCE_DATE, quantiles=5, relative_accuracy=0.01, compare=True):
+    # Sama seperti rfm.compute_rfm, tetapi threshold diambil dari sketch. Mengembalikan (rfm_table, changed)
+    # dengan changed = jumlah pelanggan yang skornya berubah dibanding threshold exact (None bila compare=False)
+    rfm_table = add_recency(customer_aggregates(orders_before(df, reference_date)), reference_date)
+    thresholds = RFMSketches(relative_accuracy).update(rfm_table).thresholds(quantiles)
+    rfm_table = score_table(rfm_table, None, quantiles, thresholds)
+    changed = score_changes(rfm_table, thresholds, quantiles) if compare else None
+    return rfm_table, changed
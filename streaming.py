@@ -0,0 +1,156 @@
+import sys
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from loader import DATA_PATH, iter_sales_chunks
+from rfm import REFERENCE_DATE, add_order_metrics, add_recency, order_keys, score_table, to_cents
+from sketch import RFMSketches
+
+# Mode streaming: CSV dibaca per chunk dan setiap chunk dilipat ke agregat parsial yang bisa di-merge.
+# Memori = ukuran chunk + agregat per pelanggan/bulan + 16 byte per pasangan (pelanggan, order) unik, karena
+# Frequency dan total order yang exact tetap butuh identitas setiap order (disimpan sebagai hash 64-bit).
+
+
+def _add(left, right):
+    if not len(left):
+        return right
+    return left.add(right, fill_value=0).astype(left.dtype)
+
+
+class DistinctPairs:
+    # Himpunan pasangan integer (first, second) dalam dua array numpy. Bagian baru ditampung dulu dan di-dedupe
+    # (lexsort) begitu ukurannya melebihi bagian yang sudah unik, jadi total biaya merge tetap O(n log n).
+
+    def __init__(self, first=None, second=None):
+        self.first = np.empty(0, dtype=np.int64) if first is None else first
+        self.second = np.empty(0, dtype=np.uint64) if second is None else second
+        self.pending = []
+        self.pending_size = 0
+
+    def add(self, first, second):
+        self.pending.append((first, second))
+        self.pending_size += len(first)
+        if self.pending_size > len(self.first):
+            self.compact()
+        return self
+
+    def merge(self, other):
+        self.add(*other.compact())
+        return self
+
+    def compact(self):
+        # Pasangan unik, terurut per (first, second)
+        if self.pending:
+            first = np.concatenate([self.first, *(part[0] for part in self.pending)])
+            second = np.concatenate([self.second, *(part[1] for part in self.pending)])
+            order = np.lexsort((second, first))
+            first, second = first[order], second[order]
+            keep = np.ones(len(first), dtype=bool)
+            keep[1:] = (first[1:] != first[:-1]) | (second[1:] != second[:-1])
+            self.first, self.second = first[keep], second[keep]
+            self.pending, self.pending_size = [], 0
+        return self.first, self.second
+
+
+class SalesAggregates:
+
+    def __init__(self):
+        self.last_transaction = pd.Series(dtype='datetime64[us]')
+        self.monetary_cents = pd.Series(dtype='int64')
+        self.customer_orders = DistinctPairs()  # (_CustomerID, hash OrderNumber)
+        self.month_sales_cents = pd.Series(dtype='int64')
+        self.month_customers = DistinctPairs()  # (ordinal bulan, _CustomerID)
+        self.channel_product_quantity = pd.Series(dtype='int64')
+        self.revenue_cents = 0
+        self.profit_cents = 0
+        self.quantity = 0
+        self.rows = 0
+
+    @classmethod
+    def from_chunk(cls, chunk):
+        part = cls()
+        customer = chunk['_CustomerID']
+        month = chunk['OrderDate'].dt.to_period('M')
+        sales_cents = pd.Series(to_cents(chunk['Sales per Order']), index=chunk.index)
+
+        part.last_transaction = chunk.groupby('_CustomerID')['OrderDate'].max()
+        part.monetary_cents = sales_cents.groupby(customer).sum()
+        customer_codes = customer.to_numpy(dtype=np.int64)
+        part.customer_orders.add(customer_codes, order_keys(chunk['OrderNumber']))
+        part.month_sales_cents = sales_cents.groupby(month).sum()
+        part.month_customers.add(month.array.asi8, customer_codes.astype(np.uint64))
+        part.channel_product_quantity = chunk.groupby([chunk['Sales Channel'].astype(str), '_ProductID'])['Order Quantity'].sum()
+        part.revenue_cents = int(sales_cents.sum())
+        part.profit_cents = int(to_cents(chunk['Profit per Order']).sum())
+        part.quantity = int(chunk['Order Quantity'].sum())
+        part.rows = len(chunk)
+        return part
+
+    def merge(self, other):
+        self.last_transaction = pd.concat([self.last_transaction, other.last_transaction]).groupby(level=0).max()
+        self.monetary_cents = _add(self.monetary_cents, other.monetary_cents)
+        self.customer_orders.merge(other.customer_orders)
+        self.month_sales_cents = _add(self.month_sales_cents, other.month_sales_cents)
+        self.month_customers.merge(other.month_customers)
+        self.channel_product_quantity = _add(self.channel_product_quantity, other.channel_product_quantity)
+        self.revenue_cents += other.revenue_cents
+        self.profit_cents += other.profit_cents
+        self.quantity += other.quantity
+        self.rows += other.rows
+        return self
+
+    # Hasil akhir dengan bentuk yang sama seperti rfm.compute_rfm dan fungsi-fungsi di eda
+
+    def rfm_table(self, reference_date=REFERENCE_DATE, quantiles=5, relative_accuracy=None):
+        # relative_accuracy: threshold dari quantile sketch. Nilai per pelanggan baru final setelah chunk terakhir,
+        # jadi sketch diisi dari agregat yang sudah dilipat, bukan per chunk
+        customers, counts = np.unique(self.customer_orders.compact()[0], return_counts=True)
+        frequency = pd.Series(counts, index=customers)
+        rfm_table = pd.DataFrame({
+            'Last_Transaction': self.last_transaction,
+            'Frequency': frequency,
+            'Monetary': self.monetary_cents / 100,
+        }).sort_index().rename_axis('_CustomerID').reset_index()
+        if relative_accuracy is None:
+            return score_table(rfm_table, reference_date, quantiles)
+        add_recency(rfm_table, reference_date)
+        thresholds = RFMSketches(relative_accuracy).update(rfm_table).thresholds(quantiles)
+        return score_table(rfm_table, None, quantiles, thresholds)
+
+    def sales_summary(self):
+        return {
+            'total_revenue': self.revenue_cents / 100,
+            'total_orders': len(np.unique(self.customer_orders.compact()[1])),
+            'sales_volume': self.quantity,
+            'total_profit': self.profit_cents / 100,
+            'total_customers': len(self.last_transaction),
+        }
+
+    def sales_trend(self):
+        trend = (self.month_sales_cents.sort_index() / 100).rename('Sales per Order')
+        return trend.rename_axis('OrderDate').reset_index()
+
+    def customers_trend(self):
+        months, counts = np.unique(self.month_customers.compact()[0], return_counts=True)
+        months = pd.Series(counts, index=pd.PeriodIndex.from_ordinals(months, freq='M'))
+        return months.rename('_CustomerID').rename_axis('OrderDate').reset_index()
+
+    def sales_volume(self):
+        volume = self.channel_product_quantity.sort_index().rename('Order Quantity')
+        return volume.rename_axis(['Sales Channel', '_ProductID']).reset_index()
+
+
+def stream_aggregates(path=DATA_PATH, chunksize=100_000):
+    parts = (SalesAggregates.from_chunk(add_order_metrics(chunk)) for chunk in iter_sales_chunks(path, chunksize))
+    return reduce(SalesAggregates.merge, parts, SalesAggregates())
+
+
+# Contoh: python streaming.py US_Regional_Sales_Data.csv 500000
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    chunksize = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    aggregates = stream_aggregates(path, chunksize)
+    print(aggregates.sales_summary())
+    print(aggregates.rfm_table()['Customer Segment'].value_counts().to_string())
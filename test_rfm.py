@@ -0,0 +1,211 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import charts
+import eda
+from cube import DistinctCustomers, SalesCube
+from loader import DATA_PATH, DATE_FORMAT, parse_sales_csv
+from migration import monthly_reference_dates, segment_snapshots
+from parallel import compute_rfm_parallel
+from rfm import REFERENCE_DATE, add_order_metrics, compute_rfm
+from rfm_cache import cache_key, cached_rfm, evict
+from rfm_index import RFMIndex
+from rfm_state import RFMState
+from sketch import compute_rfm_approx
+from streaming import stream_aggregates
+
+# Hasil jalur-jalur alternatif (streaming, parallel, state store, migrasi) harus sama persis dengan compute_rfm.
+# Jalankan dengan: python -m pytest -q
+
+COLUMNS = ['_CustomerID', 'Recency', 'Frequency', 'Monetary', 'R Score', 'F Score', 'M Score', 'RFM Score', 'Customer Segment']
+
+
+@pytest.fixture(scope='module')
+def orders():
+    return add_order_metrics(parse_sales_csv(DATA_PATH))
+
+
+@pytest.fixture(scope='module')
+def expected(orders):
+    return compute_rfm(orders)
+
+
+def legacy_rfm(df, reference_date=REFERENCE_DATE):
+    # Implementasi lama dari halaman Streamlit: groupby, pd.cut per skor dan segmen lewat perbandingan string
+    df['Sales per Order'] = round(df['Order Quantity'] * df['Unit Price'] * (1 - df['Discount Applied']), 2)
+    rfm_table = df.groupby('_CustomerID').agg(Last_Transaction=('OrderDate', 'max'), Frequency=('OrderNumber', 'nunique'),
+                                              Monetary=('Sales per Order', 'sum')).reset_index()
+    rfm_table['Recency'] = (pd.to_datetime(reference_date) - rfm_table['Last_Transaction']).dt.days
+    for col, labels in [('Recency', [5, 4, 3, 2, 1]), ('Frequency', [1, 2, 3, 4, 5]), ('Monetary', [1, 2, 3, 4, 5])]:
+        percentiles = np.percentile(rfm_table[col], [20, 40, 60, 80])
+        rfm_table[f'{col[0]} Score'] = pd.cut(rfm_table[col], bins=[0, *percentiles, np.inf], labels=labels, right=False)
+    rfm_table['RFM Score'] = rfm_table['R Score'].astype(str) + rfm_table['F Score'].astype(str) + rfm_table['M Score'].astype(str)
+
+    def customer_segment(rfm_score):
+        if "511" <= rfm_score <= "555":
+            return "Champions"
+        elif "451" <= rfm_score <= "510":
+            return "Loyal"
+        elif "351" <= rfm_score <= "450":
+            return "Potential"
+        elif "151" <= rfm_score <= "350":
+            return "At Risk"
+        return "Uncategorized"
+
+    rfm_table['Customer Segment'] = rfm_table['RFM Score'].apply(customer_segment)
+    return rfm_table
+
+
+def assert_same_rfm(actual, expected):
+    actual = actual[COLUMNS].sort_values('_CustomerID').reset_index(drop=True)
+    expected = expected[COLUMNS].sort_values('_CustomerID').reset_index(drop=True)
+    actual['Customer Segment'] = actual['Customer Segment'].astype(str)
+    expected['Customer Segment'] = expected['Customer Segment'].astype(str)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_compute_rfm_matches_legacy(orders, expected):
+    raw = pd.read_csv(DATA_PATH, thousands=',', encoding='utf-8-sig')
+    raw['OrderDate'] = pd.to_datetime(raw['OrderDate'], format=DATE_FORMAT)
+    legacy = legacy_rfm(raw)
+    for col in ['Recency', 'Frequency', 'Customer Segment']:
+        assert expected[col].astype(str).tolist() == legacy[col].astype(str).tolist()
+    np.testing.assert_allclose(expected['Monetary'], legacy['Monetary'], rtol=0, atol=1e-6)
+    assert expected['RFM Score'].astype(str).tolist() == legacy['RFM Score'].tolist()
+
+
+def test_streaming_matches(orders, expected):
+    aggregates = stream_aggregates(DATA_PATH, chunksize=997)
+    assert_same_rfm(aggregates.rfm_table(), expected)
+    assert aggregates.sales_summary() == eda.sales_summary(orders)
+    pd.testing.assert_frame_equal(aggregates.customers_trend(), eda.customers_trend(orders))
+
+
+def test_parallel_matches(orders, expected):
+    assert_same_rfm(compute_rfm_parallel(orders, workers=3), expected)
+
+
+def test_sketch_modes_match(orders):
+    # Merge sketch per shard (parallel) dan sketch atas agregat streaming memberi threshold yang sama dengan sketch in-memory
+    approx, _ = compute_rfm_approx(orders, relative_accuracy=0.01, compare=False)
+    assert_same_rfm(compute_rfm_parallel(orders, workers=3, relative_accuracy=0.01), approx)
+    assert_same_rfm(stream_aggregates(DATA_PATH, chunksize=997).rfm_table(relative_accuracy=0.01), approx)
+
+
+def test_state_replay_matches(orders, expected, tmp_path):
+    state = RFMState()
+    batches = np.array_split(np.arange(len(orders)), 4)
+    for rows in batches[:2]:
+        state.update(orders.iloc[rows])
+    state.save(tmp_path)
+    state = RFMState.load(tmp_path)
+    for rows in [batches[1], *batches[2:], batches[3]]:  # batch 1 dan 3 di-replay
+        state.update(orders.iloc[rows])
+    assert_same_rfm(state.rfm_table(), expected)
+
+
+def test_state_save_without_path():
+    with pytest.raises(ValueError):
+        RFMState().save()
+
+
+def test_segment_snapshots_match(orders):
+    dates = monthly_reference_dates(orders)
+    snapshots = segment_snapshots(orders, dates)
+    for date in dates[::7].append(dates[-1:]):
+        snapshot = snapshots[snapshots['Reference Date'] == date]
+        assert_same_rfm(snapshot, compute_rfm(orders[orders['OrderDate'] < date], date))
+
+
+def test_mid_range_reference_date(orders, tmp_path):
+    # Order pada/setelah tanggal referensi tidak ikut dihitung, di semua jalur
+    date = pd.Timestamp('2019-06-01')
+    expected = compute_rfm(orders[orders['OrderDate'] < date].copy(), date)
+    assert (expected['Recency'] > 0).all()
+    assert_same_rfm(compute_rfm(orders, date), expected)
+    assert_same_rfm(cached_rfm(orders, 'test', date, cache_dir=tmp_path), expected)
+    assert_same_rfm(cached_rfm(orders, 'test', date, cache_dir=tmp_path), expected)  # dibaca dari cache disk
+    assert_same_rfm(compute_rfm_parallel(orders, date, workers=3), expected)
+    approx, _ = compute_rfm_approx(orders[orders['OrderDate'] < date], date, compare=False)
+    assert_same_rfm(compute_rfm_approx(orders, date, compare=False)[0], approx)
+
+
+@pytest.mark.parametrize('start, end', [(None, None), ('2018-06-01', '2020-12-31'), ('2018-07-15', '2019-03-10'),
+                                        ('2019-02-01', '2019-02-28'), ('2019-02-03', '2019-02-20'), ('2019-01-31', '2019-03-01')])
+def test_cube_matches_eda(orders, expected, start, end):
+    # Bulan penuh dari rollup bulanan, bulan yang terpotong dari cell harian
+    cube = SalesCube(orders, expected)
+    dates = orders['OrderDate']
+    filtered = orders if start is None else orders[(dates >= start) & (dates <= end)]
+    pd.testing.assert_frame_equal(cube.sales_trend(start, end), eda.sales_trend(filtered))
+    actual = cube.sales_volume(start, end).sort_values(['Sales Channel', '_ProductID']).reset_index(drop=True)
+    expected_volume = eda.sales_volume(filtered).sort_values(['Sales Channel', '_ProductID']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected_volume, check_dtype=False)
+
+
+def test_rfm_cache_evicts_least_recently_used(orders, tmp_path):
+    dates = [pd.Timestamp('2019-06-01'), pd.Timestamp('2020-01-01'), REFERENCE_DATE]
+    paths = [tmp_path / f'{cache_key("test", date)}.parquet' for date in dates]
+    for age, (date, path) in enumerate(zip(dates, paths)):
+        cached_rfm(orders, 'test', date, cache_dir=tmp_path)
+        os.utime(path, (1_000_000 + age, 1_000_000 + age))
+    assert_same_rfm(cached_rfm(orders, 'test', dates[0], cache_dir=tmp_path), compute_rfm(orders, dates[0]))  # hit
+    # Hit di atas memperbarui mtime, jadi yang paling lama tidak dipakai adalah tanggal kedua
+    evict(tmp_path, max_bytes=sum(os.path.getsize(path) for path in paths) - 1)
+    assert [path.exists() for path in paths] == [True, False, True]
+
+
+def test_rfm_index_query_matches_mask():
+    # Rentang acak (termasuk batas di luar data dan nilai kembar) dibandingkan dengan mask brute force
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame({'Recency': rng.integers(1, 400, 5_000), 'Frequency': rng.integers(1, 30, 5_000),
+                          'Monetary': np.round(rng.gamma(2, 5_000, 5_000), 2)})
+    index = RFMIndex(table)
+    for _ in range(300):
+        ranges = {}
+        for col in ['Recency', 'Frequency', 'Monetary']:
+            lo, hi = np.sort(rng.uniform(table[col].min() * 0.9, table[col].max() * 1.1, 2))
+            if rng.random() < 0.3:
+                lo, hi = table[col].min(), table[col].max()
+            ranges[col] = (lo, hi)
+        mask = np.ones(len(table), dtype=bool)
+        for col, (lo, hi) in ranges.items():
+            mask &= (table[col] >= lo).to_numpy() & (table[col] <= hi).to_numpy()
+        np.testing.assert_array_equal(index.query(ranges), np.flatnonzero(mask))
+
+
+@pytest.mark.parametrize('within', [None, ['Sales Channel']])
+def test_top_n_keeps_totals(within):
+    rng = np.random.default_rng(0)
+    volume = pd.DataFrame({'Sales Channel': rng.choice(['In-Store', 'Online', 'Distributor', 'Wholesale'], 2_000),
+                           '_ProductID': rng.integers(1, 300, 2_000),
+                           'Order Quantity': rng.integers(1, 9, 2_000)})
+    volume = volume.groupby(['Sales Channel', '_ProductID'])['Order Quantity'].sum().reset_index()
+    top = charts.top_n(volume, '_ProductID', 'Order Quantity', n=10, within=within)
+    assert top['Order Quantity'].sum() == volume['Order Quantity'].sum()
+    groups = top.groupby(within) if within else [(None, top)]
+    for _, group in groups:
+        assert group['_ProductID'].nunique() <= 10 + 1
+    if within:
+        pd.testing.assert_series_equal(top.groupby('Sales Channel')['Order Quantity'].sum(),
+                                       volume.groupby('Sales Channel')['Order Quantity'].sum())
+
+
+@pytest.mark.parametrize('customers', [1_000, 100_000])
+def test_distinct_customers(customers):
+    # 1.000 pelanggan memakai bitmap exact, 100.000 pelanggan memakai HyperLogLog
+    rng = np.random.default_rng(0)
+    n_days = 30
+    day = rng.integers(0, n_days, 300_000)
+    customer = rng.integers(0, customers, len(day))
+    distinct = DistinctCustomers(day, customer, n_days)
+    assert distinct.exact == (customers == 1_000)
+    for days in [np.arange(1), np.arange(10, 20), np.arange(n_days)]:
+        expected = pd.Series(customer[np.isin(day, days)]).nunique()
+        if distinct.exact:
+            assert distinct.count(days) == expected
+        else:
+            assert distinct.count(days) == pytest.approx(expected, rel=0.05)